@@ -20,16 +20,7 @@ async def register_user(user_data: UserCreate):
             role=user_data.role
         )
         
-        return UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            role=user.role,
-            is_active=user.is_active,
-            workspace_id=user.workspace_id,
-            created_at=user.created_at
-        )
+        return user
         
     except HTTPException:
         raise
@@ -57,47 +48,18 @@ async def login_for_access_token(form_data: UserLogin):
         data={"sub": user.id}, expires_delta=access_token_expires
     )
     
-    user_response = UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        full_name=user.full_name,
-        role=user.role,
-        is_active=user.is_active,
-        workspace_id=user.workspace_id,
-        created_at=user.created_at
-    )
-    
     return Token(
         access_token=access_token,
         token_type="bearer",
-        user=user_response
+        user=user
     )
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     """Get current user profile"""
-    return UserResponse(
-        id=current_user.id,
-        username=current_user.username,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        role=current_user.role,
-        is_active=current_user.is_active,
-        workspace_id=current_user.workspace_id,
-        created_at=current_user.created_at
-    )
+    return current_user
 
 @router.post("/verify-token", response_model=UserResponse)
 async def verify_token(current_user: User = Depends(get_current_user)):
     """Verify token validity and return user info"""
-    return UserResponse(
-        id=current_user.id,
-        username=current_user.username,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        role=current_user.role,
-        is_active=current_user.is_active,
-        workspace_id=current_user.workspace_id,
-        created_at=current_user.created_at
-    )
+    return current_user
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from app.auth.auth_service import get_current_active_user
 from app.models.schemas import User
 from app.services.sentry_monitoring import (
@@ -7,11 +7,27 @@ from app.services.sentry_monitoring import (
     set_user_context,
     set_workspace_context
 )
+from config.settings import settings
+import httpx
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+SENTRY_STATUS_JSON = json.dumps({
+    "sentry_enabled": bool(settings.APP_SENTRY_DSN),
+    "sentry_dsn_configured": "***" if settings.APP_SENTRY_DSN else None,
+    "environment": settings.APP_SENTRY_ENVIRONMENT,
+    "release": settings.APP_SENTRY_RELEASE,
+    "traces_sample_rate": settings.APP_SENTRY_TRACES_SAMPLE_RATE,
+    "profiles_sample_rate": settings.APP_SENTRY_PROFILES_SAMPLE_RATE
+}).encode()
+
+def get_sentry_http(request: Request) -> httpx.AsyncClient:
+    """Shared HTTP client for Sentry API calls created at app startup"""
+    return request.app.state.sentry_http
+
 @router.post("/test-error")
 async def test_sentry_error(current_user: User = Depends(get_current_active_user)):
     """Test endpoint to generate a Sentry error event"""
@@ -64,17 +80,7 @@ async def test_sentry_message(current_user: User = Depends(get_current_active_us
 @router.get("/sentry-status")
 async def get_sentry_status():
     """Get Sentry monitoring status"""
-    from app.services.sentry_monitoring import init_sentry
-    from config.settings import settings
-    
-    return {
-        "sentry_enabled": bool(settings.APP_SENTRY_DSN),
-        "sentry_dsn_configured": "***" if settings.APP_SENTRY_DSN else None,
-        "environment": settings.APP_SENTRY_ENVIRONMENT,
-        "release": settings.APP_SENTRY_RELEASE,
-        "traces_sample_rate": settings.APP_SENTRY_TRACES_SAMPLE_RATE,
-        "profiles_sample_rate": settings.APP_SENTRY_PROFILES_SAMPLE_RATE
-    }
+    return Response(content=SENTRY_STATUS_JSON, media_type="application/json")
 
 @router.post("/simple-test-error")
 async def simple_test_error():
@@ -128,12 +134,9 @@ async def test_real_error():
         }
 
 @router.post("/test-sentry-api")
-async def test_sentry_api_connection():
+async def test_sentry_api_connection(client: httpx.AsyncClient = Depends(get_sentry_http)):
     """Test Sentry API connection with detailed debugging"""
     try:
-        import httpx
-        from config.settings import settings
-        
         default_token = settings.SENTRY_API_TOKEN
         default_org = settings.SENTRY_ORG_SLUG
         base_url = settings.SENTRY_BASE_URL
@@ -164,50 +167,49 @@ async def test_sentry_api_connection():
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{base_url}/organizations/{default_org}/",
-                    headers=headers,
-                    timeout=10.0
-                )
-                
-                debug_info["response_status"] = response.status_code
-                debug_info["response_headers"] = dict(response.headers)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "message": "Successfully connected to Sentry API",
-                        "debug_info": debug_info,
-                        "organization_data": {
-                            "id": data.get("id"),
-                            "name": data.get("name"),
-                            "slug": data.get("slug")
-                        }
-                    }
-                else:
-                    debug_info["response_text"] = response.text[:500]
-                    return {
-                        "success": False,
-                        "message": f"Sentry API returned status {response.status_code}",
-                        "debug_info": debug_info
-                    }
-                    
-            except httpx.TimeoutException:
+        try:
+            response = await client.get(
+                f"{base_url}/organizations/{default_org}/",
+                headers=headers,
+                timeout=10.0
+            )
+            
+            debug_info["response_status"] = response.status_code
+            debug_info["response_headers"] = dict(response.headers)
+            
+            if response.status_code == 200:
+                data = response.json()
                 return {
-                    "success": False,
-                    "message": "Connection timeout to Sentry API",
-                    "debug_info": debug_info
+                    "success": True,
+                    "message": "Successfully connected to Sentry API",
+                    "debug_info": debug_info,
+                    "organization_data": {
+                        "id": data.get("id"),
+                        "name": data.get("name"),
+                        "slug": data.get("slug")
+                    }
                 }
-            except Exception as api_error:
+            else:
+                debug_info["response_text"] = response.text[:500]
                 return {
                     "success": False,
-                    "message": f"API request failed: {str(api_error)}",
+                    "message": f"Sentry API returned status {response.status_code}",
                     "debug_info": debug_info
                 }
                 
+        except httpx.TimeoutException:
+            return {
+                "success": False,
+                "message": "Connection timeout to Sentry API",
+                "debug_info": debug_info
+            }
+        except Exception as api_error:
+            return {
+                "success": False,
+                "message": f"API request failed: {str(api_error)}",
+                "debug_info": debug_info
+            }
+            
     except Exception as e:
         return {
             "success": False,
@@ -216,12 +218,9 @@ async def test_sentry_api_connection():
         }
 
 @router.post("/test-sentry-with-params")
-async def test_sentry_with_params(test_data: dict):
+async def test_sentry_with_params(test_data: dict, client: httpx.AsyncClient = Depends(get_sentry_http)):
     """Test Sentry API connection with provided parameters (no auth required)"""
     try:
-        import httpx
-        from config.settings import settings
-        
         api_token = test_data.get("sentry_api_token")
         organization = test_data.get("sentry_organization")
         base_url = settings.SENTRY_BASE_URL
@@ -252,62 +251,61 @@ async def test_sentry_with_params(test_data: dict):
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{base_url}/organizations/{organization}/",
-                    headers=headers,
-                    timeout=10.0
-                )
-                
-                debug_info["response_status"] = response.status_code
-                debug_info["response_headers"] = dict(response.headers)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "message": "Successfully connected to Sentry API",
-                        "debug_info": debug_info,
-                        "organization_data": {
-                            "id": data.get("id"),
-                            "name": data.get("name"),
-                            "slug": data.get("slug")
-                        }
-                    }
-                elif response.status_code == 401:
-                    return {
-                        "success": False,
-                        "message": "Invalid API token - unauthorized",
-                        "debug_info": debug_info
-                    }
-                elif response.status_code == 404:
-                    return {
-                        "success": False,
-                        "message": f"Organization '{organization}' not found",
-                        "debug_info": debug_info
-                    }
-                else:
-                    debug_info["response_text"] = response.text[:500]
-                    return {
-                        "success": False,
-                        "message": f"Sentry API returned status {response.status_code}",
-                        "debug_info": debug_info
+        try:
+            response = await client.get(
+                f"{base_url}/organizations/{organization}/",
+                headers=headers,
+                timeout=10.0
+            )
+            
+            debug_info["response_status"] = response.status_code
+            debug_info["response_headers"] = dict(response.headers)
+            
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "success": True,
+                    "message": "Successfully connected to Sentry API",
+                    "debug_info": debug_info,
+                    "organization_data": {
+                        "id": data.get("id"),
+                        "name": data.get("name"),
+                        "slug": data.get("slug")
                     }
-                    
-            except httpx.TimeoutException:
+                }
+            elif response.status_code == 401:
                 return {
                     "success": False,
-                    "message": "Connection timeout to Sentry API",
+                    "message": "Invalid API token - unauthorized",
                     "debug_info": debug_info
                 }
-            except Exception as api_error:
+            elif response.status_code == 404:
                 return {
                     "success": False,
-                    "message": f"API request failed: {str(api_error)}",
+                    "message": f"Organization '{organization}' not found",
+                    "debug_info": debug_info
+                }
+            else:
+                debug_info["response_text"] = response.text[:500]
+                return {
+                    "success": False,
+                    "message": f"Sentry API returned status {response.status_code}",
                     "debug_info": debug_info
                 }
                 
+        except httpx.TimeoutException:
+            return {
+                "success": False,
+                "message": "Connection timeout to Sentry API",
+                "debug_info": debug_info
+            }
+        except Exception as api_error:
+            return {
+                "success": False,
+                "message": f"API request failed: {str(api_error)}",
+                "debug_info": debug_info
+            }
+            
     except Exception as e:
         return {
             "success": False,
@@ -0,0 +1,43 @@
+from fastapi import Depends, HTTPException
+from typing import Optional
+from app.auth.auth_service import get_current_active_user
+from app.models.schemas import User, Workspace
+from app.services.sentry_service import SentryService, get_sentry_service
+from app.services.workspace_cache import get_workspace
+
+async def get_current_workspace(current_user: User = Depends(get_current_active_user)) -> Optional[Workspace]:
+    """Get the current user's workspace"""
+    if not current_user.workspace_id:
+        return None
+
+    workspace_doc = await get_workspace(current_user.workspace_id)
+
+    if not workspace_doc:
+        return None
+
+    return Workspace(**{**workspace_doc, "id": str(workspace_doc["_id"])})
+
+def sentry_service_for_workspace(workspace: Optional[dict], workspace_id: str) -> SentryService:
+    """Get the shared SentryService for a workspace document, rejecting workspaces without a Sentry token"""
+    if not workspace or not workspace.get("sentry_api_token"):
+        raise HTTPException(
+            status_code=400,
+            detail="Sentry API token not configured in workspace. Please update workspace settings."
+        )
+
+    return get_sentry_service(
+        api_token=workspace["sentry_api_token"],
+        organization=workspace.get("sentry_organization"),
+        workspace_id=workspace_id
+    )
+
+async def get_workspace_sentry_service(current_user: User = Depends(get_current_active_user)) -> SentryService:
+    """Get the shared SentryService configured for the current user's workspace"""
+    if not current_user.workspace_id:
+        raise HTTPException(
+            status_code=400,
+            detail="No workspace found. Please create a workspace first."
+        )
+
+    workspace = await get_workspace(current_user.workspace_id)
+    return sentry_service_for_workspace(workspace, current_user.workspace_id)
@@ -1,97 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from typing import List, Optional
 from app.auth.auth_service import get_current_user, get_current_active_user
-from app.models.schemas import User, SentryIssue, ProcessedIssue, IssueStatus
-from app.services.sentry_service import SentryService
-from app.services.openai_service import OpenAIService
+from app.models.schemas import User, SentryIssue, IssueStatus, utc_now
+from app.services.sentry_service import SentryService, sentry_health
+from app.services.openai_service import OpenAIService, get_openai_service
+from app.api.deps import get_workspace_sentry_service, sentry_service_for_workspace
+from app.services.workspace_cache import get_workspace, get_workspace_with_settings
+from app.services.update_queue import processed_issue_updates
 from app.models.database import get_database
-from bson import ObjectId
+from app.responses import MongoJSONResponse
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from datetime import timedelta
+import asyncio
+import httpx
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+_DEFAULT_PROC_STATUS = {"status": "not_processed", "has_analysis": False}
+
+ANALYSIS_LEASE = timedelta(minutes=10)
+
 @router.get("/", response_model=dict)
 async def get_issues(
     project_id: Optional[str] = Query(None, description="Project ID to filter issues"),
     query: str = Query("is:unresolved", description="Sentry query string"),
     limit: int = Query(25, ge=1, le=100, description="Number of issues to return"),
     cursor: Optional[str] = Query(None, description="Pagination cursor"),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    sentry_service: SentryService = Depends(get_workspace_sentry_service)
 ):
     """Get issues from Sentry"""
     try:
-        if not current_user.workspace_id:
-            raise HTTPException(
-                status_code=400,
-                detail="No workspace found. Please create a workspace first."
-            )
-        
         db = get_database()
-        workspace = await db.workspaces.find_one({"_id": ObjectId(current_user.workspace_id)})
-        
-        if not workspace or not workspace.get("sentry_api_token"):
-            raise HTTPException(
-                status_code=400,
-                detail="Sentry API token not configured in workspace. Please update workspace settings."
-            )
-        
-        sentry_service = SentryService(
-            api_token=workspace["sentry_api_token"],
-            organization=workspace.get("sentry_organization"),
-            workspace_id=current_user.workspace_id
-        )
-        
-        if not await sentry_service.test_connection():
-            raise HTTPException(
-                status_code=400,
-                detail="Failed to connect to Sentry. Please check workspace Sentry settings."
-            )
         
         logger.info(f"Attempting to fetch issues with query: {query}, limit: {limit}")
-        result = await sentry_service.get_issues(
-            project_id=project_id,
-            query=query,
-            limit=limit,
-            cursor=cursor
-        )
+        try:
+            result = await sentry_service.get_issues(
+                project_id=project_id,
+                query=query,
+                limit=limit,
+                cursor=cursor
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (401, 403):
+                sentry_health.evict(current_user.workspace_id)
+                raise HTTPException(
+                    status_code=400,
+                    detail="Failed to connect to Sentry. Please check workspace Sentry settings."
+                )
+            raise
+        sentry_health.mark_healthy(current_user.workspace_id)
         logger.info(f"Received {len(result.get('issues', []))} issues from Sentry service")
         
-        processed_issues = {}
+        processed_task = None
         if result["issues"]:
             issue_ids = [issue.id for issue in result["issues"]]
-            processed_docs = await db.processed_issues.find(
+            processed_task = asyncio.ensure_future(db.processed_issues.aggregate([
                 {
-                    "sentry_issue.id": {"$in": issue_ids},
-                    "workspace_id": current_user.workspace_id
+                    "$match": {
+                        "workspace_id": current_user.workspace_id,
+                        "sentry_issue.id": {"$in": issue_ids}
+                    }
                 },
-                {"sentry_issue.id": 1, "status": 1, "ai_analysis": 1}
-            ).to_list(length=None)
-            
-            processed_issues = {
-                doc["sentry_issue"]["id"]: {
-                    "status": doc["status"],
-                    "has_analysis": bool(doc.get("ai_analysis"))
+                {
+                    "$project": {
+                        "_id": 0,
+                        "id": "$sentry_issue.id",
+                        "status": 1,
+                        "has_analysis": {"$toBool": {"$ifNull": ["$ai_analysis", False]}}
+                    }
                 }
-                for doc in processed_docs
-            }
+            ]).to_list(length=None))
         
-        for issue in result["issues"]:
-            issue_dict = issue.dict()
-            issue_dict["processing_status"] = processed_issues.get(issue.id, {
-                "status": "not_processed",
-                "has_analysis": False
-            })
+        issue_dicts = [issue.model_dump() for issue in result["issues"]]
         
-        return {
-            "issues": [issue.dict() for issue in result["issues"]],
+        processed_issues = {}
+        if processed_task:
+            processed_docs = await processed_task
+            processed_issues = {doc.pop("id"): doc for doc in processed_docs}
+        
+        for issue_dict in issue_dicts:
+            issue_dict["processing_status"] = processed_issues.get(issue_dict["id"], _DEFAULT_PROC_STATUS)
+        
+        return MongoJSONResponse({
+            "issues": issue_dicts,
             "pagination": {
                 "next_cursor": result["next_cursor"],
                 "prev_cursor": result["prev_cursor"],
                 "has_next": result["has_next"]
             },
             "processed_status": processed_issues
-        }
+        })
         
     except HTTPException:
         raise
@@ -100,37 +103,30 @@ async def get_issues(
         raise HTTPException(status_code=500, detail="Failed to fetch issues from Sentry")
 
 @router.get("/projects", response_model=List[dict])
-async def get_sentry_projects(current_user: User = Depends(get_current_active_user)):
+async def get_sentry_projects(
+    current_user: User = Depends(get_current_active_user),
+    sentry_service: SentryService = Depends(get_workspace_sentry_service)
+):
     """Get list of Sentry projects"""
     try:
-        if not current_user.workspace_id:
-            raise HTTPException(
-                status_code=400,
-                detail="No workspace found. Please create a workspace first."
-            )
-        
-        db = get_database()
-        workspace = await db.workspaces.find_one({"_id": ObjectId(current_user.workspace_id)})
-        
-        if not workspace or not workspace.get("sentry_api_token"):
-            raise HTTPException(
-                status_code=400,
-                detail="Sentry API token not configured in workspace. Please update workspace settings."
-            )
-        
-        sentry_service = SentryService(
-            api_token=workspace["sentry_api_token"],
-            organization=workspace.get("sentry_organization"),
-            workspace_id=current_user.workspace_id
-        )
-        
-        if not await sentry_service.test_connection():
-            raise HTTPException(
-                status_code=400,
-                detail="Failed to connect to Sentry. Please check your API token and organization settings."
-            )
+        if not sentry_health.is_healthy(current_user.workspace_id):
+            if not await sentry_service.test_connection():
+                raise HTTPException(
+                    status_code=400,
+                    detail="Failed to connect to Sentry. Please check your API token and organization settings."
+                )
+            sentry_health.mark_healthy(current_user.workspace_id)
         
-        projects = await sentry_service.get_projects()
+        try:
+            projects = await sentry_service.get_projects()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (401, 403):
+                sentry_health.evict(current_user.workspace_id)
+                raise HTTPException(
+                    status_code=400,
+                    detail="Failed to connect to Sentry. Please check your API token and organization settings."
+                )
+            raise
         return projects
         
     except HTTPException:
@@ -160,27 +156,16 @@ async def get_issue_details(
             if "_id" in processed_issue:
                 processed_issue["id"] = str(processed_issue["_id"])
                 del processed_issue["_id"]
-            return {"processed_issue": ProcessedIssue(**processed_issue)}
+            return MongoJSONResponse({"processed_issue": processed_issue})
         
-        workspace = await db.workspaces.find_one({"_id": ObjectId(current_user.workspace_id)})
-        
-        if not workspace or not workspace.get("sentry_api_token"):
-            raise HTTPException(
-                status_code=400,
-                detail="Sentry API token not configured in workspace"
-            )
-        
-        sentry_service = SentryService(
-            api_token=workspace["sentry_api_token"],
-            organization=workspace.get("sentry_organization"),
-            workspace_id=current_user.workspace_id
-        )
+        workspace = await get_workspace(current_user.workspace_id)
+        sentry_service = sentry_service_for_workspace(workspace, current_user.workspace_id)
         
         issue = await sentry_service.get_issue_details(issue_id)
         if not issue:
             raise HTTPException(status_code=404, detail="Issue not found")
         
-        return {"sentry_issue": issue.dict()}
+        return {"sentry_issue": issue.model_dump()}
         
     except HTTPException:
         raise
@@ -188,132 +173,107 @@ async def get_issue_details(
         logger.error(f"Failed to fetch issue details: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch issue details")
 
-@router.post("/{issue_id}/analyze", response_model=dict)
+async def _run_analysis(doc_id, claim_id: str, issue: SentryIssue, events: list, openai_service: OpenAIService):
+    """Run AI analysis for a processed issue and queue the resulting status update if the claim is still held"""
+    analysis = None
+    
+    try:
+        analysis = await openai_service.analyze_issue_batched(issue, events)
+    except Exception as e:
+        logger.error(f"Analysis failed for issue {issue.id}: {e}")
+    
+    if analysis:
+        update = {
+            "ai_analysis": analysis.model_dump(),
+            "status": IssueStatus.COMPLETED,
+            "updated_at": analysis.updated_at
+        }
+    else:
+        update = {
+            "status": IssueStatus.FAILED,
+            "updated_at": utc_now()
+        }
+    
+    await processed_issue_updates.put(UpdateOne({"_id": doc_id, "analysis_claim": claim_id}, {"$set": update}))
+
+@router.post("/{issue_id}/analyze", response_model=dict, status_code=202)
 async def analyze_issue(
     issue_id: str,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user)
 ):
-    """Analyze an issue with AI and generate technical specification"""
+    """Start AI analysis of an issue; poll the issue details for the result"""
     try:
         if not current_user.workspace_id:
             raise HTTPException(status_code=400, detail="No workspace found")
         
         db = get_database()
         
-        existing = await db.processed_issues.find_one({
-            "sentry_issue.id": issue_id,
-            "workspace_id": current_user.workspace_id
-        })
-        
-        if existing and existing.get("status") == IssueStatus.ANALYZING:
-            raise HTTPException(
-                status_code=409,
-                detail="Issue is already being analyzed"
-            )
-        
-        workspace = await db.workspaces.find_one({"_id": ObjectId(current_user.workspace_id)})
-        if not workspace or not workspace.get("sentry_api_token"):
-            raise HTTPException(
-                status_code=400,
-                detail="Sentry API token not configured in workspace"
-            )
-        
-        sentry_service = SentryService(
-            api_token=workspace["sentry_api_token"],
-            organization=workspace.get("sentry_organization"),
-            workspace_id=current_user.workspace_id
-        )
+        workspace, workspace_settings = await get_workspace_with_settings(current_user.workspace_id)
+        sentry_service = sentry_service_for_workspace(workspace, current_user.workspace_id)
         
-        workspace_settings = await db.settings.find_one({"workspace_id": current_user.workspace_id})
         openai_model = workspace_settings.get("openai_model", "gpt-4") if workspace_settings else "gpt-4"
         
-        openai_service = OpenAIService(
+        openai_service = get_openai_service(
             api_key=workspace.get("openai_api_key"),
             model=openai_model,
             workspace_id=current_user.workspace_id
         )
         
-        logger.info(f"Fetching issue details for {issue_id} from Sentry")
-        issue = await sentry_service.get_issue_details(issue_id)
+        logger.info(f"Fetching issue details and events for {issue_id} from Sentry")
+        issue, events = await asyncio.gather(
+            sentry_service.get_issue_details(issue_id),
+            sentry_service.get_issue_events(issue_id, limit=5)
+        )
         if not issue:
             logger.warning(f"Issue {issue_id} not found in Sentry")
             raise HTTPException(status_code=404, detail="Issue not found in Sentry")
         
-        events = await sentry_service.get_issue_events(issue_id, limit=5)
-        
-        from datetime import datetime
-        current_time = datetime.utcnow()
+        current_time = utc_now()
+        claim_id = uuid.uuid4().hex
+        issue_data = issue.model_dump()
         
         processed_issue_data = {
-            "sentry_issue": issue.dict(),
-            "sentry_issue_data": issue.dict(),
+            "sentry_issue": issue_data,
+            "sentry_issue_data": issue_data,
             "status": IssueStatus.ANALYZING,
+            "analysis_claim": claim_id,
             "created_by": current_user.id,
             "workspace_id": current_user.workspace_id,
             "updated_at": current_time
         }
         
-        if not existing:
-            processed_issue_data["created_at"] = current_time
-        
-        if existing:
-            await db.processed_issues.update_one(
+        try:
+            processed_doc = await db.processed_issues.find_one_and_update(
                 {
                     "sentry_issue.id": issue_id,
-                    "workspace_id": current_user.workspace_id
+                    "workspace_id": current_user.workspace_id,
+                    "$or": [
+                        {"status": {"$ne": IssueStatus.ANALYZING}},
+                        {"updated_at": {"$lt": current_time - ANALYSIS_LEASE}}
+                    ]
                 },
-                {"$set": processed_issue_data}
-            )
-            doc_id = existing["_id"]
-        else:
-            result = await db.processed_issues.insert_one(processed_issue_data)
-            doc_id = result.inserted_id
-        
-        try:
-            analysis = await openai_service.analyze_issue(issue, events)
-            
-            if analysis:
-                await db.processed_issues.update_one(
-                    {"_id": doc_id},
-                    {
-                        "$set": {
-                            "ai_analysis": analysis.dict(),
-                            "status": IssueStatus.COMPLETED,
-                            "updated_at": current_time
-                        }
-                    }
-                )
-                status = IssueStatus.COMPLETED
-            else:
-                await db.processed_issues.update_one(
-                    {"_id": doc_id},
-                    {
-                        "$set": {
-                            "status": IssueStatus.FAILED,
-                            "updated_at": current_time
-                        }
-                    }
-                )
-                status = IssueStatus.FAILED
-                
-        except Exception as e:
-            logger.error(f"Analysis failed for issue {issue_id}: {e}")
-            await db.processed_issues.update_one(
-                {"_id": doc_id},
                 {
-                    "$set": {
-                        "status": IssueStatus.FAILED,
-                        "updated_at": datetime.utcnow()
-                    }
-                }
+                    "$set": processed_issue_data,
+                    "$setOnInsert": {"created_at": current_time}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                projection={"_id": 1, "status": 1}
+            )
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=409,
+                detail="Issue is already being analyzed"
             )
-            status = IssueStatus.FAILED
-            analysis = None
+        doc_id = processed_doc["_id"]
+        
+        background_tasks.add_task(_run_analysis, doc_id, claim_id, issue, events, openai_service)
         
         return {
             "issue_id": issue_id,
-            "status": status,
-            "analysis": analysis.dict() if analysis else None
+            "status": IssueStatus.ANALYZING,
+            "analysis": None
         }
         
     except HTTPException:
@@ -341,17 +301,17 @@ async def get_processed_issues(
             query["status"] = status
         
         cursor = db.processed_issues.find(query).skip(skip).limit(limit).sort("created_at", -1)
-        issues = await cursor.to_list(length=None)
+        issues = []
         
-        for issue in issues:
-            if "_id" in issue:
-                issue["id"] = str(issue["_id"])
-                del issue["_id"]
+        async for issue in cursor:
+            issue["id"] = str(issue.pop("_id"))
             
             if "sentry_issue" in issue and "sentry_issue_data" not in issue:
                 issue["sentry_issue_data"] = issue["sentry_issue"]
+            
+            issues.append(issue)
         
-        return issues
+        return MongoJSONResponse(issues)
         
     except HTTPException:
         raise
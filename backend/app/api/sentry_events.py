@@ -1,31 +1,24 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request, Response
 from fastapi.responses import JSONResponse
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
 from app.services.sentry_event_generator import sentry_event_generator
-from app.auth.auth_service import get_current_active_user
-from app.models.schemas import User, Workspace
-from app.models.database import get_database
+from app.api.deps import get_current_workspace
+from app.models.schemas import Workspace
 from config.settings import settings
-from bson import ObjectId
+import hashlib
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-async def get_current_workspace(current_user: User = Depends(get_current_active_user)) -> Optional[Workspace]:
-    """Get the current user's workspace"""
-    if not current_user.workspace_id:
-        return None
-    
-    db = get_database()
-    workspace_doc = await db.workspaces.find_one({"_id": ObjectId(current_user.workspace_id)})
-    
-    if not workspace_doc:
-        return None
-    
-    workspace_doc["id"] = str(workspace_doc["_id"])
-    return Workspace(**workspace_doc)
+EVENT_TEMPLATES_JSON = orjson.dumps({
+    "error_templates": sentry_event_generator.error_templates,
+    "warning_templates": sentry_event_generator.warning_templates,
+    "info_templates": sentry_event_generator.info_templates
+})
+EVENT_TEMPLATES_ETAG = f'"{hashlib.md5(EVENT_TEMPLATES_JSON).hexdigest()}"'
 
 class GenerateEventRequest(BaseModel):
     event_type: Optional[str] = Field(None, description="Type of event: error, warning, info, or random")
@@ -48,6 +41,9 @@ async def generate_random_sentry_event(
     
     - **event_type**: Type of event to generate (error, warning, info, or random)
     - **count**: Number of events to generate (1-10)
+    
+    Events are sent in the background, so a returned event_id only means the event
+    was queued; it will not exist in Sentry if the client drops or samples it out.
     """
     try:
         custom_dsn = workspace.sentry_test_dsn if workspace else None
@@ -68,19 +64,13 @@ async def generate_random_sentry_event(
             event = await sentry_event_generator.generate_random_event(request.event_type, custom_dsn)
             events = [event]
         else:
-            if request.event_type:
-                events = []
-                for _ in range(request.count):
-                    event = await sentry_event_generator.generate_random_event(request.event_type, custom_dsn)
-                    events.append(event)
-            else:
-                events = await sentry_event_generator.generate_multiple_events(request.count, custom_dsn)
+            events = await sentry_event_generator.generate_multiple_events(request.count, custom_dsn, request.event_type)
         
         successful_events = [e for e in events if "error" not in e]
         
         return GenerateEventResponse(
             success=True,
-            message=f"Successfully generated {len(successful_events)} Sentry events",
+            message=f"Queued {len(successful_events)} Sentry events for sending",
             events=events,
             total_generated=len(successful_events)
         )
@@ -121,10 +111,13 @@ async def get_sentry_status_public():
     }
 
 @router.get("/event-templates")
-async def get_event_templates():
+async def get_event_templates(request: Request):
     """Get available event templates for preview"""
-    return {
-        "error_templates": sentry_event_generator.error_templates,
-        "warning_templates": sentry_event_generator.warning_templates,
-        "info_templates": sentry_event_generator.info_templates
-    }
+    if request.headers.get("if-none-match") == EVENT_TEMPLATES_ETAG:
+        return Response(status_code=304, headers={"ETag": EVENT_TEMPLATES_ETAG})
+    
+    return Response(
+        content=EVENT_TEMPLATES_JSON,
+        media_type="application/json",
+        headers={"ETag": EVENT_TEMPLATES_ETAG}
+    )
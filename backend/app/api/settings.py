@@ -1,15 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from app.auth.auth_service import get_current_user, get_current_active_user
-from app.models.schemas import User, Settings
+from app.models.schemas import User, Settings, utc_now
 from app.models.database import get_database
 from bson import ObjectId
-from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+_DEFAULT_SETTINGS = {
+    "openai_model": "gpt-4",
+    "auto_analyze": False,
+    "notification_email": True
+}
+_SETTINGS_PROJECTION = {"_id": 0, **{field: 1 for field in _DEFAULT_SETTINGS}}
+
 class SettingsUpdate(BaseModel):
     openai_model: str = None
     auto_analyze: bool = None
@@ -23,20 +29,15 @@ async def get_settings(current_user: User = Depends(get_current_active_user)):
             raise HTTPException(status_code=400, detail="No workspace found")
         
         db = get_database()
-        settings = await db.settings.find_one({"workspace_id": current_user.workspace_id})
+        settings = await db.settings.find_one(
+            {"workspace_id": current_user.workspace_id},
+            _SETTINGS_PROJECTION
+        )
         
         if not settings:
-            return {
-                "openai_model": "gpt-4",
-                "auto_analyze": False,
-                "notification_email": True
-            }
+            return _DEFAULT_SETTINGS
         
-        return {
-            "openai_model": settings.get("openai_model", "gpt-4"),
-            "auto_analyze": settings.get("auto_analyze", False),
-            "notification_email": settings.get("notification_email", True)
-        }
+        return {**_DEFAULT_SETTINGS, **settings}
         
     except HTTPException:
         raise
@@ -56,15 +57,12 @@ async def update_settings(
         
         db = get_database()
         
-        update_data = {}
-        for field, value in settings_update.dict(exclude_unset=True).items():
-            if value is not None:
-                update_data[field] = value
+        update_data = settings_update.model_dump(exclude_unset=True, exclude_none=True)
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No valid fields to update")
         
-        update_data["updated_at"] = datetime.utcnow()
+        update_data["updated_at"] = utc_now()
         
         result = await db.settings.update_one(
             {"workspace_id": current_user.workspace_id},
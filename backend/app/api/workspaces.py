@@ -1,17 +1,48 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
-from app.auth.auth_service import get_current_user, get_current_active_user
-from app.models.schemas import User, Workspace, WorkspaceCreate, WorkspaceUpdate, UserRole
+from app.auth.auth_service import auth_service, get_current_user, get_current_active_user
+from app.models.schemas import User, Workspace, WorkspaceCreate, WorkspaceUpdate, WorkspaceOut, UserRole, utc_now
 from app.models.database import get_database
-from app.services.sentry_service import SentryService
-from app.services.openai_service import OpenAIService
+from app.services.sentry_service import get_sentry_service
+from app.services.openai_service import get_openai_client
+from app.services.workspace_cache import get_workspace, invalidate_workspace
+from app.responses import MongoJSONResponse
 from bson import ObjectId
-from datetime import datetime
+import asyncio
 import logging
+import openai
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+_WORKSPACE_FIELDS = (
+    "name",
+    "description",
+    "owner_id",
+    "sentry_api_token",
+    "sentry_organization",
+    "sentry_test_dsn",
+    "openai_api_key",
+    "settings",
+    "created_at",
+    "updated_at"
+)
+_SECRET_FIELDS = ("sentry_api_token", "openai_api_key")
+
+def _workspace_response(workspace: dict, mask_secrets: bool = False) -> dict:
+    """Copy a cached workspace document into a response dict"""
+    response = {"id": str(workspace["_id"])}
+    for field in _WORKSPACE_FIELDS:
+        if field in workspace:
+            response[field] = workspace[field]
+    
+    if mask_secrets:
+        for field in _SECRET_FIELDS:
+            if response.get(field):
+                response[field] = "***"
+    
+    return response
+
 @router.post("/", response_model=dict)
 async def create_workspace(
     workspace_data: WorkspaceCreate,
@@ -21,7 +52,12 @@ async def create_workspace(
     try:
         db = get_database()
         
+        workspace_oid = ObjectId()
+        workspace_id = str(workspace_oid)
+        now = utc_now()
+        
         workspace_dict = {
+            "_id": workspace_oid,
             "name": workspace_data.name,
             "description": workspace_data.description,
             "owner_id": current_user.id,
@@ -29,26 +65,34 @@ async def create_workspace(
             "sentry_organization": None,
             "openai_api_key": None,
             "settings": {},
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "created_at": now,
+            "updated_at": now
         }
         
-        result = await db.workspaces.insert_one(workspace_dict)
-        workspace_id = str(result.inserted_id)
-        
-        await db.users.update_one(
-            {"_id": ObjectId(current_user.id)},
-            {"$set": {"workspace_id": workspace_id, "updated_at": datetime.utcnow()}}
+        insert_result, user_result = await asyncio.gather(
+            db.workspaces.insert_one(workspace_dict),
+            db.users.update_one(
+                {"_id": current_user.user_oid},
+                {"$set": {"workspace_id": workspace_id, "updated_at": now}}
+            ),
+            return_exceptions=True
         )
-        
-        workspace_dict["id"] = workspace_id
-        if "_id" in workspace_dict:
-            del workspace_dict["_id"]
-        
-        return {
+        auth_service.invalidate_user(current_user.id)
+        
+        if isinstance(insert_result, BaseException):
+            if not isinstance(user_result, BaseException):
+                await db.users.update_one(
+                    {"_id": current_user.user_oid, "workspace_id": workspace_id},
+                    {"$set": {"workspace_id": current_user.workspace_id}}
+                )
+            raise insert_result
+        if isinstance(user_result, BaseException):
+            raise user_result
+        
+        return MongoJSONResponse({
             "message": "Workspace created successfully",
-            "workspace": workspace_dict
-        }
+            "workspace": _workspace_response(workspace_dict)
+        })
         
     except Exception as e:
         logger.error(f"Failed to create workspace: {e}")
@@ -58,14 +102,10 @@ async def create_workspace(
 async def get_workspaces(current_user: User = Depends(get_current_active_user)):
     """Get user's workspaces"""
     try:
-        db = get_database()
-        
         if current_user.workspace_id:
-            workspace = await db.workspaces.find_one({"_id": ObjectId(current_user.workspace_id)})
+            workspace = await get_workspace(current_user.workspace_id)
             if workspace:
-                workspace["id"] = str(workspace["_id"])
-                del workspace["_id"]
-                return [workspace]
+                return [_workspace_response(workspace)]
         
         return []
         
@@ -73,28 +113,19 @@ async def get_workspaces(current_user: User = Depends(get_current_active_user)):
         logger.error(f"Failed to get workspaces: {e}")
         raise HTTPException(status_code=500, detail="Failed to get workspaces")
 
-@router.get("/current", response_model=dict)
+@router.get("/current", response_model=WorkspaceOut)
 async def get_current_workspace(current_user: User = Depends(get_current_active_user)):
     """Get current user's workspace"""
     try:
         if not current_user.workspace_id:
             raise HTTPException(status_code=404, detail="No workspace found. Please create a workspace first.")
         
-        db = get_database()
-        workspace = await db.workspaces.find_one({"_id": ObjectId(current_user.workspace_id)})
+        workspace = await get_workspace(current_user.workspace_id)
         
         if not workspace:
             raise HTTPException(status_code=404, detail="Workspace not found")
         
-        workspace["id"] = str(workspace["_id"])
-        del workspace["_id"]
-        
-        if "sentry_api_token" in workspace and workspace["sentry_api_token"]:
-            workspace["sentry_api_token"] = "***"
-        if "openai_api_key" in workspace and workspace["openai_api_key"]:
-            workspace["openai_api_key"] = "***"
-        
-        return workspace
+        return _workspace_response(workspace, mask_secrets=True)
         
     except HTTPException:
         raise
@@ -114,30 +145,26 @@ async def update_current_workspace(
         
         db = get_database()
         
-        workspace = await db.workspaces.find_one({"_id": ObjectId(current_user.workspace_id)})
-        if not workspace:
-            raise HTTPException(status_code=404, detail="Workspace not found")
-        
-        if workspace["owner_id"] != current_user.id:
-            raise HTTPException(status_code=403, detail="Only workspace owner can update settings")
-        
-        update_data = {}
-        
-        workspace_dict = workspace_data.dict(exclude_unset=True)
-        for field, value in workspace_dict.items():
-            if value is not None:
-                update_data[field] = value
+        update_data = workspace_data.model_dump(exclude_unset=True, exclude_none=True)
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No valid fields to update")
         
-        update_data["updated_at"] = datetime.utcnow()
+        update_data["updated_at"] = utc_now()
         
-        await db.workspaces.update_one(
-            {"_id": ObjectId(current_user.workspace_id)},
-            {"$set": update_data}
+        workspace = await db.workspaces.find_one_and_update(
+            {"_id": current_user.workspace_oid, "owner_id": current_user.id},
+            {"$set": update_data},
+            projection={"_id": 1}
         )
         
+        if not workspace:
+            if not await db.workspaces.find_one({"_id": current_user.workspace_oid}, {"_id": 1}):
+                raise HTTPException(status_code=404, detail="Workspace not found")
+            raise HTTPException(status_code=403, detail="Only workspace owner can update settings")
+        
+        invalidate_workspace(current_user.workspace_id)
+        
         return {"message": "Workspace updated successfully"}
         
     except HTTPException:
@@ -159,23 +186,28 @@ async def test_sentry_connection(
         if not api_token or not organization:
             raise HTTPException(status_code=400, detail="API token and organization are required")
         
-        sentry_service = SentryService(
+        sentry_service = get_sentry_service(
             api_token=api_token,
             organization=organization,
             workspace_id=current_user.workspace_id
         )
         
-        result = await sentry_service.test_connection_detailed()
+        result, projects = await asyncio.gather(
+            sentry_service.test_connection_detailed(),
+            sentry_service.get_projects(),
+            return_exceptions=True
+        )
+        if isinstance(result, BaseException):
+            raise result
         
         if result["success"]:
-            try:
-                projects = await sentry_service.get_projects()
+            if isinstance(projects, BaseException):
+                logger.warning(f"Could not fetch projects: {projects}")
+                result["message"] = f"{result['message']} (Note: Could not fetch projects list)"
+            else:
                 result["projects_count"] = len(projects)
                 result["projects"] = [{"id": p["id"], "name": p["name"]} for p in projects[:10]]
                 result["message"] = f"{result['message']}. Found {len(projects)} projects."
-            except Exception as e:
-                logger.warning(f"Could not fetch projects: {e}")
-                result["message"] = f"{result['message']} (Note: Could not fetch projects list)"
         
         return {
             "connected": result["success"],
@@ -204,36 +236,14 @@ async def test_openai_connection(
         if not api_key:
             raise HTTPException(status_code=400, detail="OpenAI API key is required")
         
-        openai_service = OpenAIService(
-            api_key=api_key,
-            model="gpt-3.5-turbo",
-            workspace_id=current_user.workspace_id
-        )
-        
-        import openai
-        client = openai.AsyncOpenAI(api_key=api_key)
+        client = get_openai_client(api_key)
+        models = await asyncio.wait_for(client.models.list(), timeout=5)
         
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": "Hello! Please respond with 'API key is working' if you can read this."}
-            ],
-            max_tokens=20,
-            temperature=0
-        )
-        
-        if response.choices and response.choices[0].message:
-            return {
-                "connected": True,
-                "message": "OpenAI API key is valid and working",
-                "model_used": "gpt-3.5-turbo",
-                "tokens_used": response.usage.total_tokens if response.usage else None
-            }
-        else:
-            return {
-                "connected": False,
-                "message": "OpenAI API responded but with unexpected format"
-            }
+        return {
+            "connected": True,
+            "message": "OpenAI API key is valid and working",
+            "models_available": len(models.data)
+        }
             
     except openai.AuthenticationError:
         return {
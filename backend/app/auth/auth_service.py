@@ -1,19 +1,28 @@
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from datetime import datetime, timedelta
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from config.settings import settings
-from app.models.schemas import User, UserResponse
+from app.models.schemas import User, UserResponse, utc_now
 from app.models.database import get_database
+from app.services.sentry_monitoring import set_request_user_context
 from bson import ObjectId
+from cachetools import TTLCache
+import asyncio
+import hashlib
 import logging
-from typing import Optional
+import time
+from typing import Callable, List, Optional
 
 logger = logging.getLogger(__name__)
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+_token_cache = TTLCache(maxsize=10000, ttl=30)
+_user_cache = TTLCache(maxsize=5000, ttl=60)
 
 
 security = HTTPBearer()
@@ -23,6 +32,9 @@ class AuthService:
         self.secret_key = settings.SECRET_KEY
         self.algorithm = settings.ALGORITHM
         self.access_token_expire_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        self._verify_key = jwk.construct(self.secret_key, self.algorithm)
+        self._algorithms = [self.algorithm]
+        self._user_invalidators: List[Callable[[str], None]] = []
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
@@ -40,7 +52,7 @@ class AuthService:
         if not user_data:
             return None
         
-        if not self.verify_password(password, user_data["hashed_password"]):
+        if not await asyncio.to_thread(self.verify_password, password, user_data["hashed_password"]):
             return None
         
 
@@ -48,7 +60,7 @@ class AuthService:
             user_data["id"] = str(user_data["_id"])
             del user_data["_id"]
         
-        return User(**user_data)
+        return User.model_construct(**user_data)
     
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
         """Create JWT access token"""
@@ -62,16 +74,34 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
+    def decode_cached(self, token: str) -> dict:
+        """Decode JWT token, reusing recent successful decodes"""
+        key = hashlib.sha256(token.encode()).hexdigest()[:32]
+        cached = _token_cache.get(key)
+        if cached is not None:
+            payload, exp_ts = cached
+            if exp_ts is None or time.time() <= exp_ts:
+                return payload
+            _token_cache.pop(key, None)
+        
+        payload = jwt.decode(token, self._verify_key, algorithms=self._algorithms)
+        _token_cache[key] = (payload, payload.get("exp"))
+        return payload
+    
     async def verify_token(self, token: str) -> Optional[User]:
-        """Verify JWT token and return user"""
+        """Verify JWT token and return its user, or None if the token is invalid or the user is inactive"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = self.decode_cached(token)
             user_id: str = payload.get("sub")
             if user_id is None:
                 return None
             
+            user = _user_cache.get(user_id)
+            if user is not None:
+                return user
+            
             db = get_database()
-            user_data = await db.users.find_one({"_id": ObjectId(user_id)})
+            user_data = await db.users.find_one({"_id": ObjectId(user_id), "is_active": True})
             
             if user_data is None:
                 return None
@@ -80,11 +110,33 @@ class AuthService:
             user_data["id"] = str(user_data["_id"])
             del user_data["_id"]
             
-            return User(**user_data)
+            user = User.model_construct(**user_data)
+            _user_cache[user_id] = user
+            return user
             
         except JWTError:
             return None
     
+    def get_cached_user(self, token: str) -> Optional[User]:
+        """Return the user for a token only if it resolves without a database lookup"""
+        try:
+            payload = self.decode_cached(token)
+        except JWTError:
+            return None
+        
+        user_id = payload.get("sub")
+        return _user_cache.get(user_id) if user_id else None
+    
+    def invalidate_user(self, user_id: str):
+        """Drop cached user so the next request reloads it from the database"""
+        _user_cache.pop(user_id, None)
+        for invalidator in self._user_invalidators:
+            invalidator(user_id)
+    
+    def register_user_invalidator(self, invalidator: Callable[[str], None]):
+        """Register a callback that drops another auth backend's cached user by ID"""
+        self._user_invalidators.append(invalidator)
+    
     async def create_user(self, username: str, email: str, password: str, full_name: str = None, role: str = "developer") -> User:
         """Create new user"""
         db = get_database()
@@ -104,7 +156,8 @@ class AuthService:
                 raise HTTPException(status_code=400, detail="Email already exists")
         
 
-        hashed_password = self.get_password_hash(password)
+        hashed_password = await asyncio.to_thread(self.get_password_hash, password)
+        now = utc_now()
         
 
         user_data = {
@@ -115,8 +168,8 @@ class AuthService:
             "role": role,
             "is_active": True,
             "workspace_id": None,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "created_at": now,
+            "updated_at": now
         }
         
 
@@ -125,13 +178,17 @@ class AuthService:
         if "_id" in user_data:
             del user_data["_id"]
         
-        return User(**user_data)
+        return User.model_construct(**user_data)
 
 
 auth_service = AuthService()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """Dependency to get current authenticated user"""
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -147,6 +204,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
+    set_request_user_context(user)
     return user
 
 async def get_current_user_optional(
@@ -0,0 +1,38 @@
+import fastapi.dependencies.utils as dependency_utils
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
+import logging
+
+logger = logging.getLogger(__name__)
+
+_patched = False
+
+def _memoize_by_callable(func: Callable[[Callable[..., Any]], Any]) -> Callable[[Callable[..., Any]], Any]:
+    """Cache results of a per-callable inspection helper keyed on the callable itself"""
+    results = WeakKeyDictionary()
+    
+    def wrapper(call: Callable[..., Any]) -> Any:
+        try:
+            return results[call]
+        except KeyError:
+            pass
+        except TypeError:
+            return func(call)
+        
+        result = results[call] = func(call)
+        return result
+    
+    wrapper.__wrapped__ = func
+    return wrapper
+
+def apply_fastapi_patches():
+    """Memoize FastAPI's signature and callable-type inspection for dependencies"""
+    global _patched
+    if _patched:
+        return
+    
+    for name in ("get_typed_signature", "is_coroutine_callable", "is_gen_callable", "is_async_gen_callable"):
+        setattr(dependency_utils, name, _memoize_by_callable(getattr(dependency_utils, name)))
+    
+    _patched = True
+    logger.info("FastAPI dependency inspection patches applied")
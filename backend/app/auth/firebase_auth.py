@@ -5,12 +5,20 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from config.settings import settings
 from app.models.schemas import User
 from app.models.database import get_database
+from app.auth.auth_service import auth_service
 import logging
 from typing import Optional
+from cachetools import TTLCache
+import asyncio
+import hashlib
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
+_firebase_token_cache = TTLCache(maxsize=10000, ttl=60)
+_firebase_user_cache = TTLCache(maxsize=5000, ttl=300)
+_firebase_user_keys = TTLCache(maxsize=5000, ttl=300)
 
 def initialize_firebase():
     """Initialize Firebase Admin SDK"""
@@ -33,15 +41,30 @@ security = HTTPBearer()
 
 class FirebaseAuth:
     def __init__(self):
-        self.initialized = initialize_firebase()
+        self.initialized: Optional[bool] = None
+        self._init_lock = asyncio.Lock()
+    
+    async def ensure_initialized(self) -> bool:
+        """Initialize Firebase once per process on first use"""
+        if self.initialized is None:
+            async with self._init_lock:
+                if self.initialized is None:
+                    self.initialized = await asyncio.to_thread(initialize_firebase)
+        return self.initialized
     
     async def verify_token(self, token: str) -> Optional[dict]:
         """Verify Firebase ID token"""
-        if not self.initialized:
+        if not await self.ensure_initialized():
             raise HTTPException(status_code=500, detail="Firebase not initialized")
         
+        key = hashlib.sha256(token.encode()).hexdigest()[:32]
+        cached = _firebase_token_cache.get(key)
+        if cached is not None and time.time() <= cached.get("exp", 0):
+            return cached
+        
         try:
             decoded_token = auth.verify_id_token(token)
+            _firebase_token_cache[key] = decoded_token
             return decoded_token
         except auth.InvalidIdTokenError:
             raise HTTPException(status_code=401, detail="Invalid authentication token")
@@ -53,6 +76,11 @@ class FirebaseAuth:
     
     async def get_or_create_user(self, firebase_user: dict) -> User:
         """Get existing user or create new one"""
+        cache_key = (firebase_user["uid"], firebase_user.get("email"), firebase_user.get("name"))
+        user = _firebase_user_cache.get(cache_key)
+        if user is not None:
+            return user
+        
         db = get_database()
         
 
@@ -73,7 +101,11 @@ class FirebaseAuth:
                 )
                 existing_user.update(update_data)
             
-            return User(**existing_user)
+            existing_user["id"] = str(existing_user["_id"])
+            user = User.model_construct(**existing_user)
+            _firebase_user_cache[cache_key] = user
+            _firebase_user_keys[user.id] = cache_key
+            return user
         
 
         new_user = User(
@@ -83,15 +115,23 @@ class FirebaseAuth:
             role="developer"
         )
         
-        user_dict = new_user.dict(exclude={"id"})
+        user_dict = new_user.model_dump(exclude={"id"})
         result = await db.users.insert_one(user_dict)
         user_dict["id"] = str(result.inserted_id)
         
-        return User(**user_dict)
+        return User.model_construct(**user_dict)
 
 
 firebase_auth = FirebaseAuth()
 
+def invalidate_firebase_user(user_id: str):
+    """Drop a cached Firebase user so the next request reloads it from the database"""
+    cache_key = _firebase_user_keys.pop(user_id, None)
+    if cache_key is not None:
+        _firebase_user_cache.pop(cache_key, None)
+
+auth_service.register_user_invalidator(invalidate_firebase_user)
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
@@ -1,37 +1,35 @@
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
-from app.services.sentry_monitoring import set_user_context, set_workspace_context
+from app.services.sentry_monitoring import set_request_user_context
 from app.auth.auth_service import auth_service
+from jose.exceptions import JOSEError
 import logging
 
 logger = logging.getLogger(__name__)
 
+_SKIP_PATHS = frozenset({"/", "/health", "/docs", "/openapi.json", "/redoc"})
+
 class SentryContextMiddleware(BaseHTTPMiddleware):
     """Middleware to automatically set Sentry context for authenticated requests"""
     
     async def dispatch(self, request: Request, call_next):
+        request.state.user = None
+        if request.url.path in _SKIP_PATHS:
+            return await call_next(request)
+        
         authorization = request.headers.get("Authorization")
         
         if authorization and authorization.startswith("Bearer "):
             try:
-                token = authorization.split(" ")[1]
-                user = await auth_service.verify_token(token)
+                token = authorization[7:]
+                user = auth_service.get_cached_user(token)
                 
-                if user and user.is_active:
-                    set_user_context(
-                        user_id=user.id,
-                        username=user.username,
-                        email=user.email,
-                        workspace_id=user.workspace_id
-                    )
-                    
-                    if user.workspace_id:
-                        set_workspace_context(workspace_id=user.workspace_id)
-                    
+                if user:
+                    set_request_user_context(user)
                     request.state.user = user
                     
-            except Exception as e:
-                logger.warning(f"Failed to set Sentry context: {e}")
+            except (JOSEError, LookupError) as e:
+                logger.warning("Failed to set Sentry context: %s", e)
         
         response = await call_next(request)
         return response
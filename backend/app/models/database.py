@@ -1,6 +1,9 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConnectionFailure
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, OperationFailure
+from weakref import WeakKeyDictionary
 from config.settings import settings
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,48 +14,152 @@ class Database:
 
 db = Database()
 
+def create_client() -> AsyncIOMotorClient:
+    """Create a Motor client with explicit connection pool and server selection limits"""
+    return AsyncIOMotorClient(
+        settings.MONGODB_URI,
+        maxPoolSize=settings.MONGO_MAX_POOL,
+        minPoolSize=settings.MONGO_MIN_POOL,
+        maxIdleTimeMS=60_000,
+        serverSelectionTimeoutMS=3000,
+        retryWrites=True
+    )
+
+class MongoClientPool:
+    """Motor clients keyed by event loop, since a client is bound to the loop it was first used on"""
+    _clients: "WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncIOMotorClient]" = WeakKeyDictionary()
+    
+    @classmethod
+    def register(cls, client: AsyncIOMotorClient):
+        cls._clients[asyncio.get_running_loop()] = client
+    
+    @classmethod
+    def get(cls) -> AsyncIOMotorClient:
+        loop = asyncio.get_running_loop()
+        client = cls._clients.get(loop)
+        if client is None:
+            cls._evict_closed_loops()
+            client = cls._clients[loop] = create_client()
+            logger.info("Created MongoDB client for new event loop")
+        return client
+    
+    @classmethod
+    def _evict_closed_loops(cls):
+        for loop in [loop for loop in cls._clients.keys() if loop.is_closed()]:
+            cls._clients.pop(loop).close()
+    
+    @classmethod
+    def close_all(cls):
+        for client in cls._clients.values():
+            client.close()
+        cls._clients.clear()
+
 async def connect_to_mongo():
+    if db.client is not None:
+        return
+    
     try:
-        db.client = AsyncIOMotorClient(settings.MONGODB_URI)
+        db.client = create_client()
         db.database = db.client[settings.DATABASE_NAME]
+        MongoClientPool.register(db.client)
         
-        await db.client.admin.command('ping')
+        await ensure_indexes()
         logger.info("Successfully connected to MongoDB")
         
-        await create_indexes()
-        
     except ConnectionFailure as e:
         logger.error(f"Failed to connect to MongoDB: {e}")
         raise
 
 async def close_mongo_connection():
     if db.client:
-        db.client.close()
+        MongoClientPool.close_all()
+        db.client = None
+        db.database = None
         logger.info("Disconnected from MongoDB")
 
+INDEX_SCHEMA_VERSION = 2
+
+INDEXES = {
+    "processed_issues": [
+        IndexModel([("sentry_issue.id", ASCENDING), ("workspace_id", ASCENDING)], unique=True),
+        IndexModel([("workspace_id", ASCENDING), ("sentry_issue.id", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("workspace_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("workspace_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("created_by", ASCENDING)]),
+        IndexModel([("assigned_to", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)])
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("workspace_id", ASCENDING)]),
+        IndexModel([("firebase_uid", ASCENDING)], unique=True, sparse=True)
+    ],
+    "workspaces": [
+        IndexModel([("owner_id", ASCENDING)]),
+        IndexModel([("name", ASCENDING)])
+    ],
+    "settings": [
+        IndexModel([("workspace_id", ASCENDING)], unique=True)
+    ]
+}
+
+OBSOLETE_INDEXES = {
+    "processed_issues": ["sentry_issue.id_1", "workspace_id_1"]
+}
+
 async def create_indexes():
-    try:
-        await db.database.processed_issues.create_index("sentry_issue.id")
-        await db.database.processed_issues.create_index("workspace_id")
-        await db.database.processed_issues.create_index([("sentry_issue.id", 1), ("workspace_id", 1)], unique=True)
-        await db.database.processed_issues.create_index("status")
-        await db.database.processed_issues.create_index("created_by")
-        await db.database.processed_issues.create_index("assigned_to")
-        await db.database.processed_issues.create_index("created_at")
-        
-        await db.database.users.create_index("username", unique=True)
-        await db.database.users.create_index("email", unique=True)
-        await db.database.users.create_index("workspace_id")
-        
-        await db.database.workspaces.create_index("owner_id")
-        await db.database.workspaces.create_index("name")
-        
-        await db.database.settings.create_index("workspace_id", unique=True)
-        
+    collections = list(INDEXES)
+    results = await asyncio.gather(
+        *(db.database[name].create_indexes(INDEXES[name]) for name in collections),
+        return_exceptions=True
+    )
+    
+    failed = False
+    for name, result in zip(collections, results):
+        if isinstance(result, OperationFailure):
+            failed = True
+            logger.error("Failed to create indexes for %s: %s", name, result)
+        elif isinstance(result, BaseException):
+            raise result
+    
+    if not failed:
         logger.info("Database indexes created successfully")
-        
-    except Exception as e:
-        logger.error(f"Failed to create indexes: {e}")
+    
+    return not failed
+
+async def drop_obsolete_indexes():
+    """Drop indexes made redundant by compound index prefixes, ignoring ones that no longer exist"""
+    for name, index_names in OBSOLETE_INDEXES.items():
+        for index_name in index_names:
+            try:
+                await db.database[name].drop_index(index_name)
+                logger.info("Dropped obsolete index %s on %s", index_name, name)
+            except OperationFailure as e:
+                if e.code not in (26, 27):
+                    logger.error("Failed to drop index %s on %s: %s", index_name, name, e)
+
+async def ensure_indexes():
+    """Create indexes unless the database already records the current index schema version"""
+    schema_meta = db.database["_schema_meta"]
+    
+    if not settings.FORCE_REINDEX:
+        meta = await schema_meta.find_one({"_id": "indexes"}, {"version": 1})
+        if meta and meta.get("version") == INDEX_SCHEMA_VERSION:
+            logger.info(f"Database indexes are up to date (version {INDEX_SCHEMA_VERSION})")
+            return
+    
+    if await create_indexes():
+        await drop_obsolete_indexes()
+        await schema_meta.update_one(
+            {"_id": "indexes"},
+            {"$set": {"version": INDEX_SCHEMA_VERSION}},
+            upsert=True
+        )
 
 def get_database():
-    return db.database
+    try:
+        return MongoClientPool.get()[settings.DATABASE_NAME]
+    except RuntimeError:
+        return db.database
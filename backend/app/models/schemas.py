@@ -1,7 +1,13 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
+from functools import cached_property
+from bson import ObjectId
+
+def utc_now() -> datetime:
+    """Current timezone-aware UTC time; capture once and pass it explicitly when building many models"""
+    return datetime.now(timezone.utc)
 
 class IssueStatus(str, Enum):
     PENDING = "pending"
@@ -15,6 +21,18 @@ class IssuePriority(str, Enum):
     HIGH = "high"
     CRITICAL = "critical"
 
+class StackFrame(BaseModel):
+    filename: Optional[str] = None
+    function: Optional[str] = None
+    module: Optional[str] = None
+    lineno: Optional[int] = None
+    colno: Optional[int] = None
+    in_app: Optional[bool] = None
+    context_line: Optional[str] = None
+    
+    class Config:
+        extra = "allow"
+
 class SentryIssue(BaseModel):
     id: str = Field(..., description="Sentry issue ID")
     title: str = Field(..., description="Issue title")
@@ -29,9 +47,15 @@ class SentryIssue(BaseModel):
     count: int = Field(..., description="Number of occurrences")
     userCount: int = Field(default=0, description="Number of affected users", alias="user_count")
     permalink: str = Field(..., description="Sentry issue URL")
-    stack_trace: Optional[List[Dict[str, Any]]] = Field(None, description="Stack trace data")
+    stack_trace: Optional[List[StackFrame]] = Field(None, description="Stack trace data")
     tags: Dict[str, str] = Field(default_factory=dict, description="Issue tags")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
+    
+    class Config:
+        frozen = True
+        extra = "ignore"
+        populate_by_name = True
+        validate_default = False
 
 class AIAnalysis(BaseModel):
     issue_id: str = Field(..., description="Related Sentry issue ID")
@@ -45,8 +69,8 @@ class AIAnalysis(BaseModel):
     estimated_effort: str = Field(..., description="Estimated effort (e.g., '2-4 hours')")
     affected_components: List[str] = Field(default_factory=list, description="Affected system components")
     related_issues: List[str] = Field(default_factory=list, description="Related issue IDs")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
 
 class ProcessedIssue(BaseModel):
     id: Optional[str] = Field(None, description="MongoDB document ID")
@@ -56,8 +80,8 @@ class ProcessedIssue(BaseModel):
     assigned_to: Optional[str] = Field(None, description="Assigned developer ID")
     created_by: str = Field(..., description="User ID who created the analysis")
     workspace_id: str = Field(..., description="Workspace ID")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
     
     class Config:
         use_enum_values = True
@@ -76,11 +100,21 @@ class User(BaseModel):
     role: UserRole = Field(default=UserRole.DEVELOPER, description="User role")
     is_active: bool = Field(default=True, description="Is user active")
     workspace_id: Optional[str] = Field(None, description="Associated workspace ID")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
     
     class Config:
         use_enum_values = True
+    
+    @cached_property
+    def workspace_oid(self) -> Optional[ObjectId]:
+        """Workspace ID parsed into an ObjectId once per user instance"""
+        return ObjectId(self.workspace_id) if self.workspace_id else None
+    
+    @cached_property
+    def user_oid(self) -> Optional[ObjectId]:
+        """User ID parsed into an ObjectId once per user instance"""
+        return ObjectId(self.id) if self.id else None
 
 class UserCreate(BaseModel):
     username: str = Field(..., min_length=3, max_length=50, description="Unique username")
@@ -102,6 +136,9 @@ class UserResponse(BaseModel):
     is_active: bool
     workspace_id: Optional[str]
     created_at: datetime
+    
+    class Config:
+        from_attributes = True
 
 class Workspace(BaseModel):
     id: Optional[str] = Field(None, description="MongoDB document ID")
@@ -113,8 +150,8 @@ class Workspace(BaseModel):
     sentry_test_dsn: Optional[str] = Field(None, description="Sentry DSN for generating test events")
     openai_api_key: Optional[str] = Field(None, description="OpenAI API key")
     settings: Dict[str, Any] = Field(default_factory=dict, description="Workspace settings")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
 
 class WorkspaceCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100, description="Workspace name")
@@ -128,6 +165,19 @@ class WorkspaceUpdate(BaseModel):
     sentry_test_dsn: Optional[str] = Field(None, description="Sentry DSN for generating test events")
     openai_api_key: Optional[str] = Field(None, description="OpenAI API key")
 
+class WorkspaceOut(BaseModel):
+    id: str = Field(..., description="MongoDB document ID")
+    name: str = Field(..., description="Workspace name")
+    description: Optional[str] = Field(None, description="Workspace description")
+    owner_id: str = Field(..., description="Workspace owner user ID")
+    sentry_api_token: Optional[str] = Field(None, description="Masked Sentry API token")
+    sentry_organization: Optional[str] = Field(None, description="Sentry organization slug")
+    sentry_test_dsn: Optional[str] = Field(None, description="Sentry DSN for generating test events")
+    openai_api_key: Optional[str] = Field(None, description="Masked OpenAI API key")
+    settings: Dict[str, Any] = Field(default_factory=dict, description="Workspace settings")
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -139,5 +189,5 @@ class Settings(BaseModel):
     openai_model: str = Field(default="gpt-4", description="OpenAI model to use")
     auto_analyze: bool = Field(default=False, description="Auto-analyze new issues")
     notification_email: bool = Field(default=True, description="Email notifications")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
@@ -0,0 +1,19 @@
+from fastapi.responses import ORJSONResponse
+from bson import ObjectId
+from typing import Any
+import orjson
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+class MongoJSONResponse(ORJSONResponse):
+    """orjson-backed JSON response that also encodes MongoDB ObjectIds"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS
+        )
@@ -1,22 +1,212 @@
 import openai
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from config.settings import settings
-from app.models.schemas import SentryIssue, AIAnalysis, IssuePriority
+from app.models.schemas import SentryIssue, AIAnalysis, IssuePriority, utc_now
 from app.services.sentry_monitoring import track_openai_api_call, track_issue_analysis
-import json
+from cachetools import LRUCache, TTLCache
+import asyncio
+import hashlib
+import httpx
 import logging
+import orjson
 import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+_openai_clients = TTLCache(maxsize=128, ttl=300)
+_shared_http: Optional[httpx.AsyncClient] = None
+_openai_services = LRUCache(maxsize=256)
+
+def get_openai_client(api_key: str = None) -> openai.AsyncOpenAI:
+    """Get a cached AsyncOpenAI client for an API key, backed by one shared connection pool"""
+    global _shared_http
+    if _shared_http is None or _shared_http.is_closed:
+        _shared_http = httpx.AsyncClient(timeout=openai.DEFAULT_TIMEOUT, follow_redirects=True)
+        _openai_clients.clear()
+    
+    api_key = api_key or settings.OPENAI_API_KEY
+    key = hashlib.sha256((api_key or "").encode()).hexdigest()
+    client = _openai_clients.get(key)
+    if client is None:
+        client = openai.AsyncOpenAI(api_key=api_key, http_client=_shared_http)
+        _openai_clients[key] = client
+    return client
+
+async def close_openai_clients():
+    """Close the shared OpenAI HTTP connection pool"""
+    global _shared_http
+    _openai_clients.clear()
+    _openai_services.clear()
+    if _shared_http is not None:
+        await _shared_http.aclose()
+        _shared_http = None
+
+_ANALYSIS_FORMAT = """{
+    "summary": "Brief 1-2 sentence summary of the issue",
+    "root_cause": "Detailed explanation of what is causing this error",
+    "technical_description": "Technical details about the error for developers",
+    "steps_to_reproduce": ["Step 1", "Step 2", "Step 3"],
+    "suggested_fix": "Detailed explanation of how to fix this issue",
+    "code_examples": "Code examples or configuration changes needed (if applicable)",
+    "priority": "low|medium|high|critical",
+    "estimated_effort": "Time estimate (e.g., '2-4 hours', '1-2 days')",
+    "affected_components": ["component1", "component2"],
+    "related_issues": []
+}
+
+Focus on:
+1. Identifying the root cause from the error message and context
+2. Providing actionable steps for developers
+3. Estimating the impact and effort required
+4. Suggesting preventive measures if applicable
+"""
+
+_ISSUE_DETAILS_TEMPLATE = """**Error Details:**
+- Title: {title}
+- Message: {message}
+- Level: {level}
+- Platform: {platform}
+- Project: {project}
+- Occurrences: {count} times
+- Affected Users: {user_count}
+- First Seen: {first_seen}
+- Last Seen: {last_seen}
+
+**Tags:** {tags}
+
+**Additional Context:** {metadata}"""
+
+_ANALYSIS_PROMPT_PREFIX = """
+Please analyze the following software error and provide a comprehensive technical specification:
+
+"""
+
+_ANALYSIS_PROMPT_SUFFIX = f"""
+
+Please provide your analysis in the following JSON format:
+
+{_ANALYSIS_FORMAT}"""
+
+# Completion token budgets: 4096 is the output cap of gpt-4-turbo/gpt-4o and keeps
+# prompt + output inside gpt-4's 8k context; batches are sized so they fit under it.
+_MAX_OUTPUT_TOKENS = 4096
+_ANALYSIS_MAX_TOKENS = 2000
+_BATCH_TOKENS_PER_ISSUE = 800
+_MAX_BATCH_ISSUES = _MAX_OUTPUT_TOKENS // _BATCH_TOKENS_PER_ISSUE
+
+_JSON_MODE_MODELS = ("gpt-4o", "gpt-4-turbo", "gpt-4-1106", "gpt-4-0125", "gpt-3.5-turbo-1106", "gpt-3.5-turbo-0125")
+
+_PRIORITY_MAPPING = {
+    "low": IssuePriority.LOW,
+    "medium": IssuePriority.MEDIUM,
+    "high": IssuePriority.HIGH,
+    "critical": IssuePriority.CRITICAL
+}
+
+def _extract_first_json(text: str, opening: str = "{") -> str:
+    """Return the first balanced JSON object (or array) in text, ignoring brackets inside strings"""
+    closing = "}" if opening == "{" else "]"
+    start = text.find(opening)
+    if start == -1:
+        raise ValueError("No JSON found in response")
+    
+    depth = 0
+    in_string = False
+    escape = False
+    
+    for index in range(start, len(text)):
+        char = text[index]
+        
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == opening:
+            depth += 1
+        elif char == closing:
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    
+    raise ValueError("Unterminated JSON in response")
+
+class AnalysisBatcher:
+    """Coalesces analyses requested while another is in flight into one multi-issue completion"""
+    
+    def __init__(self, service: "OpenAIService", max_batch: int = _MAX_BATCH_ISSUES, max_wait: float = 0.05):
+        self.service = service
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[SentryIssue, Optional[list], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self._in_flight = 0
+    
+    async def analyze(self, sentry_issue: SentryIssue, events_data: list = None) -> Optional[AIAnalysis]:
+        """Analyze directly when idle, otherwise join the next batch"""
+        if self._in_flight == 0 and not self._pending:
+            self._in_flight += 1
+            try:
+                return await self.service.analyze_issue(sentry_issue, events_data)
+            finally:
+                self._in_flight -= 1
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((sentry_issue, events_data, future))
+        
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[SentryIssue, Optional[list], asyncio.Future]]):
+        self._in_flight += 1
+        try:
+            analyses = await self.service.analyze_issues([(issue, events) for issue, events, _ in batch])
+        except Exception as e:
+            logger.error(f"Batch analysis of {len(batch)} issues failed: {e}")
+            analyses = [None] * len(batch)
+        finally:
+            self._in_flight -= 1
+        
+        for (_, _, future), analysis in zip(batch, analyses):
+            if not future.done():
+                future.set_result(analysis)
+
 class OpenAIService:
     def __init__(self, api_key: str = None, model: str = None, workspace_id: str = None):
-        self.client = openai.AsyncOpenAI(
-            api_key=api_key or settings.OPENAI_API_KEY
-        )
+        self.client = get_openai_client(api_key)
         self.model = model or settings.OPENAI_MODEL
         self.workspace_id = workspace_id
+        self._batcher = AnalysisBatcher(self)
+        self._response_format = (
+            {"response_format": {"type": "json_object"}}
+            if self.model.startswith(_JSON_MODE_MODELS) else {}
+        )
+    
+    async def analyze_issue_batched(self, sentry_issue: SentryIssue, events_data: list = None) -> Optional[AIAnalysis]:
+        """Analyze issue, sharing one completion with analyses requested concurrently on this service"""
+        return await self._batcher.analyze(sentry_issue, events_data)
     
     async def analyze_issue(self, sentry_issue: SentryIssue, events_data: list = None) -> Optional[AIAnalysis]:
         """Analyze Sentry issue and generate technical specification"""
@@ -31,24 +221,11 @@ class OpenAIService:
             prompt = self._create_analysis_prompt(context)
             
             api_start_time = time.time()
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a senior software engineer and technical writer. Your task is to analyze software errors and create detailed technical specifications for developers."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=2000
-            )
+            usage = {}
+            analysis_text = "".join([delta async for delta in self._stream_completion(prompt, usage)])
             
             api_response_time = time.time() - api_start_time
-            tokens_used = response.usage.total_tokens if response.usage else None
+            tokens_used = usage.get("total_tokens")
             
             track_openai_api_call(
                 model=self.model,
@@ -57,7 +234,6 @@ class OpenAIService:
                 response_time=api_response_time
             )
             
-            analysis_text = response.choices[0].message.content
             analysis = self._parse_analysis_response(analysis_text, sentry_issue.id)
             
             analysis_status = "completed"
@@ -72,30 +248,134 @@ class OpenAIService:
             
             return analysis
             
+        except openai.APIError as e:
+            error = e
+            logger.error("OpenAI API error while analyzing issue %s: %s", sentry_issue.id, e)
         except Exception as e:
             error = e
-            logger.error(f"Failed to analyze issue {sentry_issue.id}: {e}")
+            logger.exception("Failed to analyze issue %s", sentry_issue.id)
+        
+        if 'api_start_time' in locals():
+            api_response_time = time.time() - api_start_time
+            track_openai_api_call(
+                model=self.model,
+                tokens_used=tokens_used,
+                success=False,
+                response_time=api_response_time,
+                error=error
+            )
+        
+        analysis_time = time.time() - start_time
+        track_issue_analysis(
+            issue_id=sentry_issue.id,
+            workspace_id=self.workspace_id,
+            status=analysis_status,
+            analysis_time=analysis_time,
+            error=error
+        )
+        
+        return None
+    
+    async def analyze_issues(self, issues: List[Tuple[SentryIssue, Optional[list]]]) -> List[Optional[AIAnalysis]]:
+        """Analyze several issues with one completion, falling back to per-issue calls if the reply is unusable"""
+        if len(issues) == 1:
+            return [await self.analyze_issue(*issues[0])]
+        
+        if len(issues) > _MAX_BATCH_ISSUES:
+            chunks = await asyncio.gather(*(
+                self.analyze_issues(issues[i:i + _MAX_BATCH_ISSUES])
+                for i in range(0, len(issues), _MAX_BATCH_ISSUES)
+            ))
+            return [analysis for chunk in chunks for analysis in chunk]
+        
+        start_time = time.time()
+        api_response_time = None
+        tokens_used = None
+        
+        try:
+            contexts = [self._prepare_issue_context(issue, events) for issue, events in issues]
+            prompt = self._create_batch_analysis_prompt(contexts)
+            
+            usage = {}
+            analysis_text = "".join([
+                delta async for delta in self._stream_completion(
+                    prompt,
+                    usage,
+                    max_tokens=min(_BATCH_TOKENS_PER_ISSUE * len(issues), _MAX_OUTPUT_TOKENS)
+                )
+            ])
+            
+            api_response_time = time.time() - start_time
+            tokens_used = usage.get("total_tokens")
+            
+            track_openai_api_call(
+                model=self.model,
+                tokens_used=tokens_used,
+                success=True,
+                response_time=api_response_time
+            )
             
-            if 'api_start_time' in locals():
-                api_response_time = time.time() - api_start_time
+            analyses = self._parse_batch_analysis_response(analysis_text, [issue.id for issue, _ in issues])
+            
+        except Exception as e:
+            logger.warning(f"Batch analysis of {len(issues)} issues failed, analyzing individually: {e}")
+            
+            if api_response_time is None:
                 track_openai_api_call(
                     model=self.model,
                     tokens_used=tokens_used,
                     success=False,
-                    response_time=api_response_time,
-                    error=error
+                    response_time=time.time() - start_time,
+                    error=e
                 )
             
-            analysis_time = time.time() - start_time
+            return list(await asyncio.gather(*(self.analyze_issue(issue, events) for issue, events in issues)))
+        
+        analysis_time = time.time() - start_time
+        for issue, _ in issues:
             track_issue_analysis(
-                issue_id=sentry_issue.id,
+                issue_id=issue.id,
                 workspace_id=self.workspace_id,
-                status=analysis_status,
-                analysis_time=analysis_time,
-                error=error
+                status="completed",
+                analysis_time=analysis_time
             )
+        
+        return analyses
+    
+    async def stream_analysis(self, sentry_issue: SentryIssue, events_data: list = None) -> AsyncIterator[str]:
+        """Yield raw analysis text deltas as the model generates them; join them for _parse_analysis_response"""
+        context = self._prepare_issue_context(sentry_issue, events_data)
+        async for delta in self._stream_completion(self._create_analysis_prompt(context), {}):
+            yield delta
+    
+    async def _stream_completion(self, prompt: str, usage: dict, max_tokens: int = _ANALYSIS_MAX_TOKENS) -> AsyncIterator[str]:
+        """Stream completion text deltas, recording token usage from the final chunk into usage"""
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a senior software engineer and technical writer. Your task is to analyze software errors and create detailed technical specifications for developers."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=0.3,
+            max_tokens=max_tokens,
+            stream=True,
+            extra_body={"stream_options": {"include_usage": True}},
+            **self._response_format
+        )
+        
+        async for chunk in stream:
+            chunk_usage = getattr(chunk, "usage", None)
+            if chunk_usage:
+                usage["total_tokens"] = chunk_usage.get("total_tokens") if isinstance(chunk_usage, dict) else chunk_usage.total_tokens
             
-            return None
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
     
     def _prepare_issue_context(self, issue: SentryIssue, events_data: list = None) -> dict:
         """Prepare issue context for AI analysis"""
@@ -115,7 +395,7 @@ class OpenAIService:
         }
         
         if issue.stack_trace:
-            context["stack_trace"] = issue.stack_trace
+            context["stack_trace"] = [frame.model_dump(exclude_none=True) for frame in issue.stack_trace]
         
         if events_data:
             context["recent_events"] = events_data[:3]
@@ -124,86 +404,41 @@ class OpenAIService:
     
     def _create_analysis_prompt(self, context: dict) -> str:
         """Create prompt for AI analysis"""
+        return _ANALYSIS_PROMPT_PREFIX + self._format_issue_details(context) + _ANALYSIS_PROMPT_SUFFIX
+    
+    def _create_batch_analysis_prompt(self, contexts: List[dict]) -> str:
+        """Create prompt asking for one analysis per issue in an "analyses" JSON array"""
+        details = "\n\n".join(
+            f"### Error {index}\n\n{self._format_issue_details(context)}"
+            for index, context in enumerate(contexts, 1)
+        )
+        
         return f"""
-Please analyze the following software error and provide a comprehensive technical specification:
+Please analyze each of the following {len(contexts)} software errors independently and provide a comprehensive technical specification for each:
 
-**Error Details:**
-- Title: {context['title']}
-- Message: {context['message']}
-- Level: {context['level']}
-- Platform: {context['platform']}
-- Project: {context['project']}
-- Occurrences: {context['count']} times
-- Affected Users: {context['user_count']}
-- First Seen: {context['first_seen']}
-- Last Seen: {context['last_seen']}
-
-**Tags:** {json.dumps(context.get('tags', {}), indent=2)}
-
-**Additional Context:** {json.dumps(context.get('metadata', {}), indent=2)}
-
-Please provide your analysis in the following JSON format:
+{details}
 
-{{
-    "summary": "Brief 1-2 sentence summary of the issue",
-    "root_cause": "Detailed explanation of what is causing this error",
-    "technical_description": "Technical details about the error for developers",
-    "steps_to_reproduce": ["Step 1", "Step 2", "Step 3"],
-    "suggested_fix": "Detailed explanation of how to fix this issue",
-    "code_examples": "Code examples or configuration changes needed (if applicable)",
-    "priority": "low|medium|high|critical",
-    "estimated_effort": "Time estimate (e.g., '2-4 hours', '1-2 days')",
-    "affected_components": ["component1", "component2"],
-    "related_issues": []
-}}
+Please provide your analysis as a JSON object of the form {{"analyses": [...]}}, where the array holds exactly {len(contexts)} objects, in the same order as the errors above, each in the following JSON format:
 
-Focus on:
-1. Identifying the root cause from the error message and context
-2. Providing actionable steps for developers
-3. Estimating the impact and effort required
-4. Suggesting preventive measures if applicable
-"""
+{_ANALYSIS_FORMAT}"""
+    
+    def _format_issue_details(self, context: dict) -> str:
+        """Format the per-issue section of an analysis prompt"""
+        return _ISSUE_DETAILS_TEMPLATE.format_map({
+            **context,
+            "tags": orjson.dumps(context.get("tags") or {}, option=orjson.OPT_NON_STR_KEYS).decode(),
+            "metadata": orjson.dumps(context.get("metadata") or {}, option=orjson.OPT_NON_STR_KEYS).decode()
+        })
     
     def _parse_analysis_response(self, response_text: str, issue_id: str) -> AIAnalysis:
         """Parse AI response into AIAnalysis object"""
         try:
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx == -1 or end_idx == 0:
-                raise ValueError("No JSON found in response")
+            analysis_data = orjson.loads(_extract_first_json(response_text))
             
-            json_text = response_text[start_idx:end_idx]
-            analysis_data = json.loads(json_text)
+            return self._build_analysis(analysis_data, issue_id)
             
-            priority_mapping = {
-                "low": IssuePriority.LOW,
-                "medium": IssuePriority.MEDIUM,
-                "high": IssuePriority.HIGH,
-                "critical": IssuePriority.CRITICAL
-            }
-            
-            priority = priority_mapping.get(
-                analysis_data.get("priority", "medium").lower(),
-                IssuePriority.MEDIUM
-            )
-            
-            return AIAnalysis(
-                issue_id=issue_id,
-                summary=analysis_data.get("summary", ""),
-                root_cause=analysis_data.get("root_cause", ""),
-                technical_description=analysis_data.get("technical_description", ""),
-                steps_to_reproduce=analysis_data.get("steps_to_reproduce", []),
-                suggested_fix=analysis_data.get("suggested_fix", ""),
-                code_examples=analysis_data.get("code_examples"),
-                priority=priority,
-                estimated_effort=analysis_data.get("estimated_effort", "Unknown"),
-                affected_components=analysis_data.get("affected_components", []),
-                related_issues=analysis_data.get("related_issues", [])
-            )
-            
-        except Exception as e:
-            logger.error(f"Failed to parse AI response: {e}")
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.error("Failed to parse AI response: %s", e)
             
             return AIAnalysis(
                 issue_id=issue_id,
@@ -214,3 +449,53 @@ Focus on:
                 priority=IssuePriority.MEDIUM,
                 estimated_effort="Unknown"
             )
+    
+    def _parse_batch_analysis_response(self, response_text: str, issue_ids: List[str]) -> List[AIAnalysis]:
+        """Parse the analyses array of a batch AI response into one AIAnalysis per issue, raising if it does not line up"""
+        analyses_data = orjson.loads(_extract_first_json(response_text, "["))
+        
+        if not isinstance(analyses_data, list) or len(analyses_data) != len(issue_ids):
+            raise ValueError(f"Expected {len(issue_ids)} analyses in response")
+        
+        now = utc_now()
+        return [
+            self._build_analysis(analysis_data, issue_id, now)
+            for analysis_data, issue_id in zip(analyses_data, issue_ids)
+        ]
+    
+    def _build_analysis(self, analysis_data: dict, issue_id: str, now: datetime = None) -> AIAnalysis:
+        """Build AIAnalysis from a parsed analysis object without re-validating it"""
+        now = now or utc_now()
+        
+        priority = _PRIORITY_MAPPING.get(
+            analysis_data.get("priority", "medium").lower(),
+            IssuePriority.MEDIUM
+        )
+        
+        return AIAnalysis.model_construct(
+            issue_id=issue_id,
+            summary=analysis_data.get("summary", ""),
+            root_cause=analysis_data.get("root_cause", ""),
+            technical_description=analysis_data.get("technical_description", ""),
+            steps_to_reproduce=analysis_data.get("steps_to_reproduce", []),
+            suggested_fix=analysis_data.get("suggested_fix", ""),
+            code_examples=analysis_data.get("code_examples"),
+            priority=priority,
+            estimated_effort=analysis_data.get("estimated_effort", "Unknown"),
+            affected_components=analysis_data.get("affected_components", []),
+            related_issues=analysis_data.get("related_issues", []),
+            created_at=now,
+            updated_at=now
+        )
+
+def get_openai_service(api_key: str = None, model: str = None, workspace_id: str = None) -> OpenAIService:
+    """Get a long-lived OpenAIService for a workspace, reusing its cached AsyncOpenAI client"""
+    client = get_openai_client(api_key)
+    model = model or settings.OPENAI_MODEL
+    
+    key = (id(client), model, workspace_id)
+    openai_service = _openai_services.get(key)
+    if openai_service is None or openai_service.client is not client:
+        openai_service = OpenAIService(api_key=api_key, model=model, workspace_id=workspace_id)
+        _openai_services[key] = openai_service
+    return openai_service
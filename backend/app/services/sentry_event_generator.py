@@ -1,19 +1,35 @@
 import random
 import traceback
 import asyncio
+import uuid
 from typing import List, Dict, Any, Optional
 import sentry_sdk
-from sentry_sdk import capture_exception, capture_message, set_tag, set_extra
+from sentry_sdk.utils import event_from_exception
 from config.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+EXCEPTION_MAP = {
+    "ValueError": ValueError,
+    "KeyError": KeyError,
+    "ConnectionError": ConnectionError,
+    "IndexError": IndexError,
+    "FileNotFoundError": FileNotFoundError,
+    "PermissionError": PermissionError,
+    "TimeoutError": TimeoutError,
+    "ValidationError": ValueError,
+    "AuthenticationError": ValueError,
+    "RateLimitError": ValueError,
+}
+
 class SentryEventGenerator:
     """Service for generating random events in Sentry for testing purposes"""
     
     def __init__(self):
         self.current_dsn = None
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._dispatcher_task: Optional[asyncio.Task] = None
         self.error_templates = [
             {
                 "type": "ValueError",
@@ -118,15 +134,15 @@ class SentryEventGenerator:
             }
         ]
 
-    def _generate_random_context(self) -> Dict[str, Any]:
-        """Generate additional random context for events"""
-        return {
-            "request_id": f"req_{random.randint(10000, 99999)}",
-            "session_id": f"sess_{random.randint(1000, 9999)}",
-            "server_id": f"server_{random.randint(1, 10)}",
-            "timestamp": "2024-08-20T10:30:00Z",
-            "version": "1.0.0"
-        }
+    def _generate_random_context(self, base: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Generate random context for events, layered over a copy of the template context"""
+        context = dict(base) if base else {}
+        context["request_id"] = f"req_{random.randrange(10000, 100000)}"
+        context["session_id"] = f"sess_{random.randrange(1000, 10000)}"
+        context["server_id"] = f"server_{random.randrange(1, 11)}"
+        context["timestamp"] = "2024-08-20T10:30:00Z"
+        context["version"] = "1.0.0"
+        return context
 
     def _setup_sentry_dsn(self, custom_dsn: Optional[str] = None) -> str:
         """Setup Sentry DSN for event generation"""
@@ -147,6 +163,67 @@ class SentryEventGenerator:
         
         return dsn
 
+    async def _enqueue_capture(self, exception: Exception = None, message: str = None, level: str = "error", tags: Dict[str, str] = None, extras: Dict[str, Any] = None) -> str:
+        """Queue an event for the background dispatcher and return its pre-assigned event ID (the event may still be dropped or sampled out)"""
+        if self._dispatcher_task is None:
+            self._event_queue = asyncio.Queue(maxsize=65535)
+            self._dispatcher_task = asyncio.create_task(self._dispatcher())
+        
+        event_id = uuid.uuid4().hex
+        await self._event_queue.put({
+            "hub": sentry_sdk.Hub(sentry_sdk.Hub.current),
+            "event_id": event_id,
+            "exception": exception,
+            "message": message,
+            "level": level,
+            "tags": tags or {},
+            "extras": extras or {}
+        })
+        return event_id
+    
+    async def _dispatcher(self):
+        """Serialize and hand queued events to the Sentry transport off the event loop"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            payload = await self._event_queue.get()
+            if payload is None:
+                break
+            
+            try:
+                await loop.run_in_executor(None, self._capture, payload)
+            except Exception as e:
+                logger.error(f"Failed to capture generated event {payload['event_id']}: {e}")
+    
+    def _capture(self, payload: Dict[str, Any]):
+        hub = payload["hub"]
+        exception = payload["exception"]
+        hint = None
+        
+        if exception is not None:
+            client_options = hub.client.options if hub.client else None
+            event, hint = event_from_exception(
+                (type(exception), exception, exception.__traceback__),
+                client_options=client_options
+            )
+        else:
+            event = {"message": payload["message"]}
+        
+        event["event_id"] = payload["event_id"]
+        event["level"] = payload["level"]
+        if hub.capture_event(event, hint, tags=payload["tags"], extras=payload["extras"]) is None:
+            logger.warning(f"Generated event {payload['event_id']} was dropped by the Sentry client")
+    
+    async def stop(self):
+        """Send any queued events and stop the background dispatcher"""
+        if self._dispatcher_task is None:
+            return
+        
+        await self._event_queue.put(None)
+        await self._dispatcher_task
+        self._dispatcher_task = None
+        self._event_queue = None
+    
     def is_sentry_configured(self, custom_dsn: Optional[str] = None) -> bool:
         """Check if Sentry is configured"""
         dsn = custom_dsn or settings.APP_SENTRY_DSN
@@ -154,24 +231,8 @@ class SentryEventGenerator:
 
     def _create_fake_exception(self, error_template: Dict[str, Any]) -> Exception:
         """Create a fake exception based on template"""
-        error_type = error_template["type"]
-        message = error_template["message"]
-        
-        exception_map = {
-            "ValueError": ValueError,
-            "KeyError": KeyError,
-            "ConnectionError": ConnectionError,
-            "IndexError": IndexError,
-            "FileNotFoundError": FileNotFoundError,
-            "PermissionError": PermissionError,
-            "TimeoutError": TimeoutError,
-            "ValidationError": ValueError,
-            "AuthenticationError": ValueError,
-            "RateLimitError": ValueError,
-        }
-        
-        exception_class = exception_map.get(error_type, Exception)
-        return exception_class(message)
+        exception_class = EXCEPTION_MAP.get(error_template["type"], Exception)
+        return exception_class(error_template["message"])
 
     async def generate_random_error(self, custom_dsn: Optional[str] = None) -> Dict[str, Any]:
         """Generate a random error event in Sentry"""
@@ -179,21 +240,22 @@ class SentryEventGenerator:
         
         error_template = random.choice(self.error_templates)
         
-        set_tag("event_type", "generated_error")
-        set_tag("error_category", error_template["type"])
-        set_tag("environment", "testing")
+        tags = {
+            "event_type": "generated_error",
+            "error_category": error_template["type"],
+            "environment": "testing"
+        }
         
-        context = {**error_template["context"], **self._generate_random_context()}
-        for key, value in context.items():
-            set_extra(key, value)
+        context = self._generate_random_context(error_template["context"])
         
         try:
             self._simulate_stack_trace(error_template)
         except Exception as e:
-            event_id = capture_exception(e)
+            event_id = await self._enqueue_capture(exception=e, tags=tags, extras=context)
             
             return {
                 "event_id": event_id,
+                "status": "queued",
                 "type": "error",
                 "error_type": error_template["type"],
                 "message": error_template["message"],
@@ -219,18 +281,24 @@ class SentryEventGenerator:
         
         warning_template = random.choice(self.warning_templates)
         
-        set_tag("event_type", "generated_warning")
-        set_tag("level", "warning")
-        set_tag("environment", "testing")
+        tags = {
+            "event_type": "generated_warning",
+            "level": "warning",
+            "environment": "testing"
+        }
         
-        context = {**warning_template["context"], **self._generate_random_context()}
-        for key, value in context.items():
-            set_extra(key, value)
+        context = self._generate_random_context(warning_template["context"])
         
-        event_id = capture_message(warning_template["message"], level="warning")
+        event_id = await self._enqueue_capture(
+            message=warning_template["message"],
+            level="warning",
+            tags=tags,
+            extras=context
+        )
         
         return {
             "event_id": event_id,
+            "status": "queued",
             "type": "warning", 
             "message": warning_template["message"],
             "context": context
@@ -242,18 +310,24 @@ class SentryEventGenerator:
         
         info_template = random.choice(self.info_templates)
         
-        set_tag("event_type", "generated_info")
-        set_tag("level", "info")
-        set_tag("environment", "testing")
+        tags = {
+            "event_type": "generated_info",
+            "level": "info",
+            "environment": "testing"
+        }
         
-        context = {**info_template["context"], **self._generate_random_context()}
-        for key, value in context.items():
-            set_extra(key, value)
+        context = self._generate_random_context(info_template["context"])
         
-        event_id = capture_message(info_template["message"], level="info")
+        event_id = await self._enqueue_capture(
+            message=info_template["message"],
+            level="info",
+            tags=tags,
+            extras=context
+        )
         
         return {
             "event_id": event_id,
+            "status": "queued",
             "type": "info",
             "message": info_template["message"],
             "context": context
@@ -273,20 +347,23 @@ class SentryEventGenerator:
         else:
             raise ValueError(f"Unknown event type: {event_type}")
 
-    async def generate_multiple_events(self, count: int = 5, custom_dsn: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Generate multiple random events"""
+    async def generate_multiple_events(self, count: int = 5, custom_dsn: Optional[str] = None, event_type: str = None) -> List[Dict[str, Any]]:
+        """Generate multiple events of one type (or random types) concurrently"""
+        results = await asyncio.gather(
+            *(self.generate_random_event(event_type, custom_dsn) for _ in range(count)),
+            return_exceptions=True
+        )
+        
         events = []
-        for _ in range(count):
-            try:
-                event = await self.generate_random_event(None, custom_dsn)
-                events.append(event)
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                logger.error(f"Failed to generate event: {e}")
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to generate event: {result}")
                 events.append({
-                    "error": str(e),
+                    "error": str(result),
                     "type": "generation_failed"
                 })
+            else:
+                events.append(result)
         
         return events
 
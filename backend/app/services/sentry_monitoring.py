@@ -117,6 +117,22 @@ def set_workspace_context(workspace_id, workspace_name=None, owner_id=None):
     
     sentry_sdk.set_context("workspace", workspace_data)
 
+def set_request_user_context(user):
+    """Set Sentry user and workspace context for an authenticated user in one scope update"""
+    user_data = {"id": user.id}
+    
+    if user.username:
+        user_data["username"] = user.username
+    if user.email:
+        user_data["email"] = user.email
+    if user.workspace_id:
+        user_data["workspace_id"] = user.workspace_id
+    
+    with sentry_sdk.configure_scope() as scope:
+        scope.set_user(user_data)
+        if user.workspace_id:
+            scope.set_context("workspace", {"workspace_id": user.workspace_id})
+
 def track_issue_analysis(issue_id, workspace_id, status, analysis_time=None, error=None):
     """Track issue analysis events"""
     with sentry_sdk.configure_scope() as scope:
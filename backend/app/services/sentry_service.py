@@ -4,13 +4,40 @@ from datetime import datetime
 from config.settings import settings
 from app.models.schemas import SentryIssue
 from app.services.sentry_monitoring import track_sentry_api_call
+from cachetools import LRUCache
+import asyncio
 import logging
+import re
 import time
 
 logger = logging.getLogger(__name__)
 
+_sentry_services = LRUCache(maxsize=256)
+_shared_client: Optional[httpx.AsyncClient] = None
+
+_LINK_RE = re.compile(r'<([^>]+)>;\s*rel="([^"]+)"(?:;\s*results="([^"]+)")?')
+_CURSOR_RE = re.compile(r'cursor=([^&>]+)')
+
+class HealthCache:
+    """Remembers workspaces whose Sentry connection was verified recently"""
+    
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._connection_ok_until: Dict[str, float] = {}
+    
+    def is_healthy(self, workspace_id: str) -> bool:
+        return self._connection_ok_until.get(workspace_id, 0.0) > time.monotonic()
+    
+    def mark_healthy(self, workspace_id: str):
+        self._connection_ok_until[workspace_id] = time.monotonic() + self.ttl
+    
+    def evict(self, workspace_id: str):
+        self._connection_ok_until.pop(workspace_id, None)
+
+sentry_health = HealthCache(ttl=60.0)
+
 class SentryService:
-    def __init__(self, api_token: str = None, organization: str = None, workspace_id: str = None):
+    def __init__(self, api_token: str = None, organization: str = None, workspace_id: str = None, client: httpx.AsyncClient = None):
         self.api_token = api_token or settings.SENTRY_API_TOKEN
         self.organization = organization or settings.SENTRY_ORG_SLUG
         self.workspace_id = workspace_id
@@ -19,6 +46,31 @@ class SentryService:
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json"
         }
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient()
+        self._etag_cache = LRUCache(maxsize=128)
+    
+    async def aclose(self):
+        """Close the underlying HTTP client unless it is shared"""
+        if self._owns_client:
+            await self.client.aclose()
+    
+    async def _conditional_get(self, url: str, params: Dict[str, Any] = None, timeout: float = 30.0) -> httpx.Response:
+        """GET with If-None-Match, serving the cached response when Sentry answers 304"""
+        key = str(httpx.URL(url, params=params))
+        cached = self._etag_cache.get(key)
+        headers = {**self.headers, "If-None-Match": cached[0]} if cached else self.headers
+        
+        response = await self.client.get(url, headers=headers, params=params, timeout=timeout)
+        
+        if response.status_code == 304 and cached:
+            return cached[1]
+        
+        etag = response.headers.get("ETag")
+        if response.status_code == 200 and etag:
+            self._etag_cache[key] = (etag, response)
+        
+        return response
     
     async def test_connection(self) -> bool:
         start_time = time.time()
@@ -26,24 +78,23 @@ class SentryService:
         error = None
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/organizations/{self.organization}/",
-                    headers=self.headers,
-                    timeout=10.0
-                )
-                success = response.status_code == 200
-                
-                response_time = time.time() - start_time
-                track_sentry_api_call(
-                    endpoint=f"organizations/{self.organization}",
-                    workspace_id=self.workspace_id,
-                    success=success,
-                    response_time=response_time
-                )
-                
-                return success
-                
+            response = await self.client.get(
+                f"{self.base_url}/organizations/{self.organization}/",
+                headers=self.headers,
+                timeout=10.0
+            )
+            success = response.status_code == 200
+            
+            response_time = time.time() - start_time
+            track_sentry_api_call(
+                endpoint=f"organizations/{self.organization}",
+                workspace_id=self.workspace_id,
+                success=success,
+                response_time=response_time
+            )
+            
+            return success
+            
         except Exception as e:
             error = e
             logger.error(f"Failed to test Sentry connection: {e}")
@@ -64,69 +115,68 @@ class SentryService:
         start_time = time.time()
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/organizations/{self.organization}/",
-                    headers=self.headers,
-                    timeout=10.0
+            response = await self.client.get(
+                f"{self.base_url}/organizations/{self.organization}/",
+                headers=self.headers,
+                timeout=10.0
+            )
+            
+            response_time = time.time() - start_time
+            
+            if response.status_code == 200:
+                data = response.json()
+                track_sentry_api_call(
+                    endpoint=f"organizations/{self.organization}",
+                    workspace_id=self.workspace_id,
+                    success=True,
+                    response_time=response_time
                 )
-                
-                response_time = time.time() - start_time
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    track_sentry_api_call(
-                        endpoint=f"organizations/{self.organization}",
-                        workspace_id=self.workspace_id,
-                        success=True,
-                        response_time=response_time
-                    )
-                    return {
-                        "success": True,
-                        "message": "Successfully connected to Sentry",
-                        "organization": {
-                            "id": data.get("id"),
-                            "name": data.get("name"),
-                            "slug": data.get("slug")
-                        }
-                    }
-                elif response.status_code == 401:
-                    track_sentry_api_call(
-                        endpoint=f"organizations/{self.organization}",
-                        workspace_id=self.workspace_id,
-                        success=False,
-                        response_time=response_time
-                    )
-                    return {
-                        "success": False,
-                        "message": "Invalid API token. Please check your Sentry API token and make sure it has the necessary permissions.",
-                        "error_code": "unauthorized"
-                    }
-                elif response.status_code == 404:
-                    track_sentry_api_call(
-                        endpoint=f"organizations/{self.organization}",
-                        workspace_id=self.workspace_id,
-                        success=False,
-                        response_time=response_time
-                    )
-                    return {
-                        "success": False,
-                        "message": f"Organization '{self.organization}' not found. Please check the organization slug.",
-                        "error_code": "not_found"
-                    }
-                else:
-                    track_sentry_api_call(
-                        endpoint=f"organizations/{self.organization}",
-                        workspace_id=self.workspace_id,
-                        success=False,
-                        response_time=response_time
-                    )
-                    return {
-                        "success": False,
-                        "message": f"Sentry API returned status {response.status_code}. Please try again later.",
-                        "error_code": "api_error"
+                return {
+                    "success": True,
+                    "message": "Successfully connected to Sentry",
+                    "organization": {
+                        "id": data.get("id"),
+                        "name": data.get("name"),
+                        "slug": data.get("slug")
                     }
-                
+                }
+            elif response.status_code == 401:
+                track_sentry_api_call(
+                    endpoint=f"organizations/{self.organization}",
+                    workspace_id=self.workspace_id,
+                    success=False,
+                    response_time=response_time
+                )
+                return {
+                    "success": False,
+                    "message": "Invalid API token. Please check your Sentry API token and make sure it has the necessary permissions.",
+                    "error_code": "unauthorized"
+                }
+            elif response.status_code == 404:
+                track_sentry_api_call(
+                    endpoint=f"organizations/{self.organization}",
+                    workspace_id=self.workspace_id,
+                    success=False,
+                    response_time=response_time
+                )
+                return {
+                    "success": False,
+                    "message": f"Organization '{self.organization}' not found. Please check the organization slug.",
+                    "error_code": "not_found"
+                }
+            else:
+                track_sentry_api_call(
+                    endpoint=f"organizations/{self.organization}",
+                    workspace_id=self.workspace_id,
+                    success=False,
+                    response_time=response_time
+                )
+                return {
+                    "success": False,
+                    "message": f"Sentry API returned status {response.status_code}. Please try again later.",
+                    "error_code": "api_error"
+                }
+            
         except httpx.TimeoutException:
             response_time = time.time() - start_time
             track_sentry_api_call(
@@ -163,24 +213,21 @@ class SentryService:
         error = None
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/organizations/{self.organization}/projects/",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                
-                response_time = time.time() - start_time
-                track_sentry_api_call(
-                    endpoint=f"organizations/{self.organization}/projects",
-                    workspace_id=self.workspace_id,
-                    success=True,
-                    response_time=response_time
-                )
-                
-                return response.json()
-                
+            response = await self._conditional_get(
+                f"{self.base_url}/organizations/{self.organization}/projects/"
+            )
+            response.raise_for_status()
+            
+            response_time = time.time() - start_time
+            track_sentry_api_call(
+                endpoint=f"organizations/{self.organization}/projects",
+                workspace_id=self.workspace_id,
+                success=True,
+                response_time=response_time
+            )
+            
+            return response.json()
+            
         except Exception as e:
             error = e
             logger.error(f"Failed to fetch projects: {e}")
@@ -221,44 +268,38 @@ class SentryService:
             if cursor:
                 params["cursor"] = cursor
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    url,
-                    headers=self.headers,
-                    params=params,
-                    timeout=30.0
-                )
-                
-                logger.info(f"Sentry API response status: {response.status_code}")
-                
-                if response.status_code != 200:
-                    logger.error(f"Sentry API error: {response.status_code} - {response.text}")
-                    response.raise_for_status()
-                
-                issues_data = response.json()
-                logger.info(f"Received {len(issues_data)} issues from Sentry")
-                
-                issues = []
-                for i, issue_data in enumerate(issues_data):
-                    try:
-                        logger.debug(f"Parsing issue {i+1}: ID={issue_data.get('id')}, Title={issue_data.get('title', 'No title')[:50]}...")
-                        issue = self._parse_issue(issue_data)
-                        issues.append(issue)
-                    except Exception as e:
-                        logger.warning(f"Failed to parse issue {issue_data.get('id')}: {e}")
-                        continue
-                
-                logger.info(f"Successfully parsed {len(issues)} issues")
-                
-                links = self._parse_link_header(response.headers.get("Link", ""))
-                
-                return {
-                    "issues": issues,
-                    "next_cursor": links.get("next", {}).get("cursor"),
-                    "prev_cursor": links.get("previous", {}).get("cursor"),
-                    "has_next": "next" in links
-                }
-                
+            response = await self._conditional_get(url, params=params)
+            
+            logger.info(f"Sentry API response status: {response.status_code}")
+            
+            if response.status_code != 200:
+                logger.error(f"Sentry API error: {response.status_code} - {response.text}")
+                response.raise_for_status()
+            
+            issues_data = response.json()
+            logger.info(f"Received {len(issues_data)} issues from Sentry")
+            
+            issues = []
+            for i, issue_data in enumerate(issues_data):
+                try:
+                    logger.debug(f"Parsing issue {i+1}: ID={issue_data.get('id')}, Title={issue_data.get('title', 'No title')[:50]}...")
+                    issue = self._parse_issue(issue_data)
+                    issues.append(issue)
+                except Exception as e:
+                    logger.warning(f"Failed to parse issue {issue_data.get('id')}: {e}")
+                    continue
+            
+            logger.info(f"Successfully parsed {len(issues)} issues")
+            
+            links = self._parse_link_header(response.headers.get("Link", ""))
+            
+            return {
+                "issues": issues,
+                "next_cursor": links.get("next", {}).get("cursor"),
+                "prev_cursor": links.get("previous", {}).get("cursor"),
+                "has_next": "next" in links
+            }
+            
         except Exception as e:
             logger.error(f"Failed to fetch issues: {e}")
             raise
@@ -274,50 +315,41 @@ class SentryService:
             logger.info(f"Using organization: {self.organization}")
             logger.info(f"Using base URL: {self.base_url}")
             
-            async with httpx.AsyncClient() as client:
-                org_url = f"{self.base_url}/organizations/{self.organization}/issues/{issue_id}/"
-                logger.info(f"Trying organization endpoint: {org_url}")
-                
-                response = await client.get(
-                    org_url,
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                
-                logger.info(f"Organization endpoint response status: {response.status_code}")
-                
-                if response.status_code == 404:
-                    global_url = f"{self.base_url}/issues/{issue_id}/"
-                    logger.info(f"Trying global endpoint: {global_url}")
-                    
-                    response = await client.get(
-                        global_url,
-                        headers=self.headers,
-                        timeout=30.0
-                    )
-                    logger.info(f"Global endpoint response status: {response.status_code}")
-                
-                if response.status_code != 200:
-                    logger.error(f"Sentry API error: {response.status_code} - {response.text}")
-                    return None
-                
-                response.raise_for_status()
-                success = True
-                
-                issue_data = response.json()
-                logger.info(f"Successfully fetched issue data: {issue_data.get('id')} - {issue_data.get('title', 'No title')}")
-                result = self._parse_issue(issue_data)
-                
-                response_time = time.time() - start_time
-                track_sentry_api_call(
-                    endpoint=f"issues/{issue_id}",
-                    workspace_id=self.workspace_id,
-                    success=success,
-                    response_time=response_time
-                )
-                
-                return result
+            org_url = f"{self.base_url}/organizations/{self.organization}/issues/{issue_id}/"
+            logger.info(f"Trying organization endpoint: {org_url}")
+            
+            response = await self._conditional_get(org_url)
+            
+            logger.info(f"Organization endpoint response status: {response.status_code}")
+            
+            if response.status_code == 404:
+                global_url = f"{self.base_url}/issues/{issue_id}/"
+                logger.info(f"Trying global endpoint: {global_url}")
                 
+                response = await self._conditional_get(global_url)
+                logger.info(f"Global endpoint response status: {response.status_code}")
+            
+            if response.status_code != 200:
+                logger.error(f"Sentry API error: {response.status_code} - {response.text}")
+                return None
+            
+            response.raise_for_status()
+            success = True
+            
+            issue_data = response.json()
+            logger.info(f"Successfully fetched issue data: {issue_data.get('id')} - {issue_data.get('title', 'No title')}")
+            result = self._parse_issue(issue_data)
+            
+            response_time = time.time() - start_time
+            track_sentry_api_call(
+                endpoint=f"issues/{issue_id}",
+                workspace_id=self.workspace_id,
+                success=success,
+                response_time=response_time
+            )
+            
+            return result
+            
         except Exception as e:
             error = e
             logger.error(f"Failed to fetch issue details for {issue_id}: {e}")
@@ -340,36 +372,35 @@ class SentryService:
         error = None
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/organizations/{self.organization}/issues/{issue_id}/events/",
+            response = await self.client.get(
+                f"{self.base_url}/organizations/{self.organization}/issues/{issue_id}/events/",
+                headers=self.headers,
+                params={"limit": limit},
+                timeout=30.0
+            )
+            
+            if response.status_code == 404:
+                response = await self.client.get(
+                    f"{self.base_url}/issues/{issue_id}/events/",
                     headers=self.headers,
                     params={"limit": limit},
                     timeout=30.0
                 )
-                
-                if response.status_code == 404:
-                    response = await client.get(
-                        f"{self.base_url}/issues/{issue_id}/events/",
-                        headers=self.headers,
-                        params={"limit": limit},
-                        timeout=30.0
-                    )
-                
-                response.raise_for_status()
-                success = True
-                result = response.json()
-                
-                response_time = time.time() - start_time
-                track_sentry_api_call(
-                    endpoint=f"issues/{issue_id}/events",
-                    workspace_id=self.workspace_id,
-                    success=success,
-                    response_time=response_time
-                )
-                
-                return result
-                
+            
+            response.raise_for_status()
+            success = True
+            result = response.json()
+            
+            response_time = time.time() - start_time
+            track_sentry_api_call(
+                endpoint=f"issues/{issue_id}/events",
+                workspace_id=self.workspace_id,
+                success=success,
+                response_time=response_time
+            )
+            
+            return result
+            
         except Exception as e:
             error = e
             logger.error(f"Failed to fetch events for issue {issue_id}: {e}")
@@ -385,6 +416,17 @@ class SentryService:
             
             return []
     
+    async def get_issues_bulk(self, issue_ids: List[str], max_concurrency: int = 10) -> List[Optional[SentryIssue]]:
+        """Get details for several issues concurrently, capped to stay within Sentry rate limits"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def fetch(issue_id: str) -> Optional[SentryIssue]:
+            async with semaphore:
+                return await self.get_issue_details(issue_id)
+        
+        results = await asyncio.gather(*(fetch(issue_id) for issue_id in issue_ids), return_exceptions=True)
+        return [None if isinstance(result, Exception) else result for result in results]
+    
     def _parse_issue(self, issue_data: Dict[str, Any]) -> SentryIssue:
         """Parse Sentry issue data into our schema"""
         try:
@@ -404,16 +446,16 @@ class SentryService:
             logger.debug(f"Extracted message: {message}")
             
             try:
-                first_seen = datetime.fromisoformat(issue_data["firstSeen"].replace("Z", "+00:00"))
+                first_seen = _parse_timestamp(issue_data["firstSeen"])
                 logger.debug(f"Parsed firstSeen: {first_seen}")
-            except (KeyError, ValueError, AttributeError) as e:
+            except (KeyError, ValueError, AttributeError, TypeError) as e:
                 logger.warning(f"Failed to parse firstSeen for issue {issue_data.get('id')}: {e}")
                 first_seen = datetime.now()
             
             try:
-                last_seen = datetime.fromisoformat(issue_data["lastSeen"].replace("Z", "+00:00"))
+                last_seen = _parse_timestamp(issue_data["lastSeen"])
                 logger.debug(f"Parsed lastSeen: {last_seen}")
-            except (KeyError, ValueError, AttributeError) as e:
+            except (KeyError, ValueError, AttributeError, TypeError) as e:
                 logger.warning(f"Failed to parse lastSeen for issue {issue_data.get('id')}: {e}")
                 last_seen = datetime.now()
             
@@ -481,16 +523,53 @@ class SentryService:
         if not link_header:
             return links
         
-        for link in link_header.split(","):
-            parts = link.strip().split(";")
-            if len(parts) != 2:
+        for match in _LINK_RE.finditer(link_header):
+            url, rel, results = match.groups()
+            if results == "false":
                 continue
             
-            url = parts[0].strip()[1:-1]
-            rel = parts[1].strip().split("=")[1][1:-1]
-            
-            if "cursor=" in url:
-                cursor = url.split("cursor=")[1].split("&")[0]
-                links[rel] = {"url": url, "cursor": cursor}
+            cursor_match = _CURSOR_RE.search(url)
+            if cursor_match:
+                links[rel] = {"url": url, "cursor": cursor_match.group(1)}
         
         return links
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse a Sentry ISO-8601 timestamp, accepting a trailing Z for UTC"""
+    if value[-1:] == "Z":
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Get the process-wide keep-alive HTTP client used for all Sentry API calls"""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+        )
+    return _shared_client
+
+def get_sentry_service(api_token: str, organization: str = None, workspace_id: str = None) -> SentryService:
+    """Get a long-lived SentryService backed by the shared HTTP connection pool"""
+    client = get_shared_client()
+    
+    key = (api_token, organization, workspace_id)
+    sentry_service = _sentry_services.get(key)
+    if sentry_service is None or sentry_service.client is not client:
+        sentry_service = SentryService(
+            api_token=api_token,
+            organization=organization,
+            workspace_id=workspace_id,
+            client=client
+        )
+        _sentry_services[key] = sentry_service
+    return sentry_service
+
+async def close_sentry_services():
+    """Close the shared HTTP client and drop cached SentryService instances"""
+    global _shared_client
+    _sentry_services.clear()
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
@@ -0,0 +1,89 @@
+from pymongo import UpdateOne
+from typing import List, Optional
+from app.models.database import get_database
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BulkUpdateQueue:
+    """Coalesces updates to a collection into periodic unordered bulk_write calls"""
+
+    def __init__(self, collection: str, max_batch: int = 50, max_delay: float = 0.1, max_retries: int = 3, retry_delay: float = 0.5):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background writer on the running event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush pending updates and stop the background writer"""
+        if self._task is None:
+            return
+
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def put(self, operation: UpdateOne):
+        """Queue an update; written directly when the writer is not running"""
+        if self._task is None:
+            await self._write([operation])
+            return
+
+        await self._queue.put(operation)
+
+    async def _write(self, batch: List[UpdateOne]):
+        """Write a batch, retrying with backoff; the queued updates are idempotent $set operations"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                await get_database()[self.collection].bulk_write(batch, ordered=False)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Failed to write {len(batch)} queued {self.collection} updates after {attempt + 1} attempts: {e}")
+                    return
+                
+                logger.warning(f"Retrying {len(batch)} queued {self.collection} updates after error: {e}")
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            operation = await self._queue.get()
+            if operation is None:
+                break
+
+            batch = [operation]
+            deadline = loop.time() + self.max_delay
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    operation = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+                if operation is None:
+                    stopping = True
+                    break
+
+                batch.append(operation)
+
+            await self._write(batch)
+
+processed_issue_updates = BulkUpdateQueue("processed_issues")
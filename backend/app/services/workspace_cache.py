@@ -0,0 +1,56 @@
+from cachetools import TTLCache
+from bson import ObjectId
+from typing import Optional, Tuple
+from app.models.database import get_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+_workspace_cache = TTLCache(maxsize=1000, ttl=30)
+
+async def get_workspace(workspace_id: str) -> Optional[dict]:
+    """Get workspace document by ID; the cached dict is shared, do not mutate it"""
+    workspace = _workspace_cache.get(workspace_id)
+    if workspace is not None:
+        return workspace
+
+    db = get_database()
+    workspace = await db.workspaces.find_one({"_id": ObjectId(workspace_id)})
+
+    if workspace is not None:
+        _workspace_cache[workspace_id] = workspace
+
+    return workspace
+
+async def get_workspace_with_settings(workspace_id: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """Get workspace and its settings document in a single database round trip"""
+    db = get_database()
+    workspace = _workspace_cache.get(workspace_id)
+    if workspace is not None:
+        return workspace, await db.settings.find_one({"workspace_id": workspace_id})
+
+    docs = await db.workspaces.aggregate([
+        {"$match": {"_id": ObjectId(workspace_id)}},
+        {"$lookup": {
+            "from": "settings",
+            "let": {"wsid": {"$toString": "$_id"}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$workspace_id", "$$wsid"]}}},
+                {"$limit": 1}
+            ],
+            "as": "_settings"
+        }}
+    ]).to_list(length=1)
+
+    if not docs:
+        return None, None
+
+    workspace = docs[0]
+    settings_docs = workspace.pop("_settings")
+    _workspace_cache[workspace_id] = workspace
+
+    return workspace, settings_docs[0] if settings_docs else None
+
+def invalidate_workspace(workspace_id: str):
+    """Drop cached workspace so the next read reloads it from the database"""
+    _workspace_cache.pop(workspace_id, None)
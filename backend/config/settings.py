@@ -13,6 +13,9 @@ class Settings:
     
     MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     DATABASE_NAME = os.getenv("DATABASE_NAME", "sentry_ai_explainer")
+    MONGO_MAX_POOL = int(os.getenv("MONGO_MAX_POOL", 100))
+    MONGO_MIN_POOL = int(os.getenv("MONGO_MIN_POOL", 0))
+    FORCE_REINDEX = os.getenv("FORCE_REINDEX", "False").lower() in ("true", "1", "yes", "on")
     
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
@@ -24,6 +27,7 @@ class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 1440))
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
     
     APP_SENTRY_DSN = os.getenv("APP_SENTRY_DSN")
     APP_SENTRY_ENVIRONMENT = os.getenv("APP_SENTRY_ENVIRONMENT", "development")
@@ -4,10 +4,18 @@ from config.settings import settings
 from app.models.database import connect_to_mongo, close_mongo_connection
 from app.api import issues, settings as settings_api, auth, workspaces, debug, sentry_events
 from app.services.sentry_monitoring import init_sentry
+from app.services.sentry_service import close_sentry_services, get_shared_client
+from app.services.openai_service import close_openai_clients
+from app.services.update_queue import processed_issue_updates
+from app.services.sentry_event_generator import sentry_event_generator
 from app.middleware.sentry_context import SentryContextMiddleware
+from app.auth.fastapi_patches import apply_fastapi_patches
+from app.responses import MongoJSONResponse
+import httpx
 import logging
 
 sentry_initialized = init_sentry()
+apply_fastapi_patches()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,7 +24,8 @@ app = FastAPI(
     title="AI Sentry Issues Explainer",
     description="AI-powered technical specification generator from Sentry issues",
     version="1.0.0",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=MongoJSONResponse
 )
 
 @app.get("/")
@@ -55,10 +64,22 @@ async def startup_event():
     if sentry_initialized:
         logger.info("Sentry monitoring enabled")
     await connect_to_mongo()
+    processed_issue_updates.start()
+    
+    app.state.sentry_http = get_shared_client()
+    if settings.DEBUG:
+        try:
+            await app.state.sentry_http.get(settings.SENTRY_BASE_URL)
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to pre-warm Sentry HTTP client: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down AI Sentry Issues Explainer API")
+    await close_sentry_services()
+    await sentry_event_generator.stop()
+    await close_openai_clients()
+    await processed_issue_updates.stop()
     await close_mongo_connection()
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["authentication"])
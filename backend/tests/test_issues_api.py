@@ -0,0 +1,106 @@
+import main
+from fastapi.testclient import TestClient
+from app.api import issues
+from app.auth.auth_service import get_current_active_user
+from app.models.schemas import User, IssueStatus, SentryIssue
+from bson import ObjectId
+from datetime import datetime, timezone
+import pytest
+
+WORKSPACE_ID = str(ObjectId())
+
+class FakeCollection:
+    """Holds a single processed issue document"""
+
+    def __init__(self, document):
+        self.document = document
+
+    async def find_one(self, *args, **kwargs):
+        return dict(self.document) if self.document else None
+
+    async def find_one_and_update(self, filter, update, **kwargs):
+        self.document = {"_id": ObjectId(), **update["$setOnInsert"], **update["$set"]}
+        return {"_id": self.document["_id"], "status": self.document["status"]}
+
+class FakeDatabase:
+    def __init__(self, document):
+        self.processed_issues = FakeCollection(document)
+
+@pytest.fixture
+def client():
+    main.app.dependency_overrides[get_current_active_user] = lambda: User.model_construct(
+        id=str(ObjectId()),
+        username="dev",
+        workspace_id=WORKSPACE_ID
+    )
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+def test_get_issue_details_serializes_object_id_fields(client, monkeypatch):
+    """Test stored documents with extra ObjectId fields are returned with a 200"""
+    doc_id = ObjectId()
+    claim = ObjectId()
+    document = {
+        "_id": doc_id,
+        "sentry_issue": {"id": "123"},
+        "status": IssueStatus.ANALYZING,
+        "analysis_claim": claim,
+        "created_by": ObjectId(),
+        "workspace_id": WORKSPACE_ID,
+        "updated_at": datetime.now(timezone.utc)
+    }
+    monkeypatch.setattr(issues, "get_database", lambda: FakeDatabase(document))
+
+    response = client.get("/api/v1/issues/123")
+
+    assert response.status_code == 200
+    processed_issue = response.json()["processed_issue"]
+    assert processed_issue["id"] == str(doc_id)
+    assert processed_issue["status"] == IssueStatus.ANALYZING
+
+def test_get_issue_details_after_analysis_claim(client, monkeypatch):
+    """Test an issue can be read back while its analysis claim is held"""
+    now = datetime.now(timezone.utc)
+    issue = SentryIssue(
+        id="123",
+        title="Issue 123",
+        message="boom",
+        level="error",
+        platform="python",
+        project_id="1",
+        project_name="backend",
+        first_seen=now,
+        last_seen=now,
+        count=1,
+        permalink="https://sentry.io/issues/123/"
+    )
+
+    class FakeSentryService:
+        async def get_issue_details(self, issue_id):
+            return issue
+
+        async def get_issue_events(self, issue_id, limit=5):
+            return []
+
+    async def fake_workspace_with_settings(workspace_id):
+        return {"openai_api_key": "test-key"}, {}
+
+    async def fake_run_analysis(*args):
+        pass
+
+    database = FakeDatabase(None)
+    monkeypatch.setattr(issues, "get_database", lambda: database)
+    monkeypatch.setattr(issues, "get_workspace_with_settings", fake_workspace_with_settings)
+    monkeypatch.setattr(issues, "sentry_service_for_workspace", lambda workspace, workspace_id: FakeSentryService())
+    monkeypatch.setattr(issues, "get_openai_service", lambda **kwargs: None)
+    monkeypatch.setattr(issues, "_run_analysis", fake_run_analysis)
+
+    claim_response = client.post("/api/v1/issues/123/analyze")
+    assert claim_response.status_code == 202
+
+    response = client.get("/api/v1/issues/123")
+
+    assert response.status_code == 200
+    processed_issue = response.json()["processed_issue"]
+    assert processed_issue["status"] == IssueStatus.ANALYZING
+    assert isinstance(processed_issue["analysis_claim"], str)
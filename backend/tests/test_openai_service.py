@@ -0,0 +1,222 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from app.models.schemas import SentryIssue, AIAnalysis, IssuePriority
+from app.services import openai_service
+from app.services.openai_service import AnalysisBatcher, OpenAIService, _extract_first_json
+import orjson
+
+def make_issue(issue_id: str) -> SentryIssue:
+    now = datetime.now(timezone.utc)
+    return SentryIssue(
+        id=issue_id,
+        title=f"Issue {issue_id}",
+        message="boom",
+        level="error",
+        platform="python",
+        project_id="1",
+        project_name="backend",
+        first_seen=now,
+        last_seen=now,
+        count=1,
+        permalink=f"https://sentry.io/issues/{issue_id}/"
+    )
+
+def make_analysis(issue_id: str, summary: str) -> AIAnalysis:
+    return AIAnalysis(
+        issue_id=issue_id,
+        summary=summary,
+        root_cause="",
+        technical_description="",
+        suggested_fix="",
+        priority=IssuePriority.MEDIUM,
+        estimated_effort="Unknown"
+    )
+
+class FakeService:
+    """Records direct and batched calls; direct calls block until released"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.direct_calls = []
+        self.batches = []
+
+    async def analyze_issue(self, issue, events_data=None):
+        self.direct_calls.append(issue.id)
+        await self.release.wait()
+        return make_analysis(issue.id, "direct")
+
+    async def analyze_issues(self, issues):
+        self.batches.append([issue.id for issue, _ in issues])
+        return [make_analysis(issue.id, "batched") for issue, _ in issues]
+
+@pytest.mark.asyncio
+async def test_batcher_analyzes_directly_when_idle():
+    """Test a solo analysis bypasses batching"""
+    service = FakeService()
+    service.release.set()
+    batcher = AnalysisBatcher(service)
+
+    analysis = await batcher.analyze(make_issue("1"))
+
+    assert analysis.summary == "direct"
+    assert service.direct_calls == ["1"]
+    assert service.batches == []
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_when_batch_is_full():
+    """Test a full batch is sent without waiting for the timeout"""
+    service = FakeService()
+    batcher = AnalysisBatcher(service, max_batch=3, max_wait=60)
+
+    in_flight = asyncio.create_task(batcher.analyze(make_issue("0")))
+    await asyncio.sleep(0)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.analyze(make_issue(str(i))) for i in range(1, 4))),
+        timeout=1
+    )
+
+    assert service.batches == [["1", "2", "3"]]
+    assert [analysis.issue_id for analysis in results] == ["1", "2", "3"]
+    assert all(analysis.summary == "batched" for analysis in results)
+
+    service.release.set()
+    await in_flight
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_partial_batch_on_timeout():
+    """Test a partial batch is sent once max_wait elapses"""
+    service = FakeService()
+    batcher = AnalysisBatcher(service, max_batch=5, max_wait=0.01)
+
+    in_flight = asyncio.create_task(batcher.analyze(make_issue("0")))
+    await asyncio.sleep(0)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.analyze(make_issue("1")), batcher.analyze(make_issue("2"))),
+        timeout=1
+    )
+
+    assert service.batches == [["1", "2"]]
+    assert [analysis.issue_id for analysis in results] == ["1", "2"]
+
+    service.release.set()
+    await in_flight
+
+@pytest.mark.asyncio
+async def test_batcher_resolves_batch_with_none_when_batch_raises():
+    """Test waiters get None rather than hanging when the batch call fails"""
+    service = FakeService()
+
+    async def failing_batch(issues):
+        raise RuntimeError("boom")
+
+    service.analyze_issues = failing_batch
+    batcher = AnalysisBatcher(service, max_batch=2, max_wait=60)
+
+    in_flight = asyncio.create_task(batcher.analyze(make_issue("0")))
+    await asyncio.sleep(0)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(batcher.analyze(make_issue("1")), batcher.analyze(make_issue("2"))),
+        timeout=1
+    )
+
+    assert results == [None, None]
+
+    service.release.set()
+    await in_flight
+
+@pytest.mark.asyncio
+async def test_analyze_issues_falls_back_to_single_calls_on_bad_reply():
+    """Test an unusable batch reply is re-run per issue"""
+    service = OpenAIService(api_key="test-key")
+    requested_tokens = []
+
+    async def fake_stream(prompt, usage, max_tokens=2000):
+        requested_tokens.append(max_tokens)
+        yield '{"analyses": [{"summary": "only one"}]}'
+
+    single_calls = []
+
+    async def fake_analyze_issue(issue, events_data=None):
+        single_calls.append(issue.id)
+        return make_analysis(issue.id, "single")
+
+    service._stream_completion = fake_stream
+    service.analyze_issue = fake_analyze_issue
+
+    results = await service.analyze_issues([(make_issue("1"), None), (make_issue("2"), None)])
+
+    assert single_calls == ["1", "2"]
+    assert [analysis.summary for analysis in results] == ["single", "single"]
+    assert requested_tokens and all(tokens <= openai_service._MAX_OUTPUT_TOKENS for tokens in requested_tokens)
+
+@pytest.mark.asyncio
+async def test_analyze_issues_splits_oversized_batches_under_token_cap():
+    """Test large batches are split so no completion exceeds the output token cap"""
+    service = OpenAIService(api_key="test-key")
+    requested = []
+
+    async def fake_stream(prompt, usage, max_tokens=2000):
+        count = prompt.count("### Error ")
+        requested.append((count, max_tokens))
+        yield '{"analyses": [' + ",".join('{"summary": "ok"}' for _ in range(count)) + "]}"
+
+    service._stream_completion = fake_stream
+    issue_count = openai_service._MAX_BATCH_ISSUES * 2 + 1
+    issues = [(make_issue(str(i)), None) for i in range(issue_count)]
+
+    async def fake_analyze_issue(issue, events_data=None):
+        requested.append((1, openai_service._ANALYSIS_MAX_TOKENS))
+        return make_analysis(issue.id, "ok")
+
+    service.analyze_issue = fake_analyze_issue
+
+    results = await service.analyze_issues(issues)
+
+    assert [analysis.issue_id for analysis in results] == [str(i) for i in range(issue_count)]
+    assert all(count <= openai_service._MAX_BATCH_ISSUES for count, _ in requested)
+    assert all(tokens <= openai_service._MAX_OUTPUT_TOKENS for _, tokens in requested)
+
+def test_extract_first_json_handles_nested_objects():
+    """Test nested objects are returned whole"""
+    text = '{"a": {"b": {"c": 1}}, "d": [1, {"e": 2}]}'
+    assert _extract_first_json(text) == text
+
+def test_extract_first_json_ignores_braces_inside_strings():
+    """Test braces inside string values do not change the depth"""
+    text = '{"summary": "use {placeholders} and a lone }", "x": 1} trailing }'
+    assert orjson.loads(_extract_first_json(text)) == {"summary": "use {placeholders} and a lone }", "x": 1}
+
+def test_extract_first_json_handles_escaped_quotes():
+    """Test escaped quotes do not end a string early"""
+    text = r'{"code_examples": "print(\"{\")", "priority": "high"}'
+    assert orjson.loads(_extract_first_json(text)) == {"code_examples": 'print("{")', "priority": "high"}
+
+def test_extract_first_json_skips_prose_and_code_fences():
+    """Test leading prose and markdown fences around the JSON are skipped"""
+    text = 'Here is the analysis:\n```json\n{"summary": "ok"}\n```\nLet me know if {anything} else.'
+    assert orjson.loads(_extract_first_json(text)) == {"summary": "ok"}
+
+def test_extract_first_json_extracts_arrays():
+    """Test the array form used for batch replies"""
+    text = '{"analyses": [{"summary": "a ]"}, {"summary": "b"}]}'
+    assert orjson.loads(_extract_first_json(text, "[")) == [{"summary": "a ]"}, {"summary": "b"}]
+
+def test_extract_first_json_rejects_truncated_json():
+    """Test a reply cut off mid-object raises instead of returning a partial slice"""
+    with pytest.raises(ValueError):
+        _extract_first_json('{"summary": "cut off", "root_cause": {"detail": "x"')
+
+def test_extract_first_json_rejects_text_without_json():
+    """Test a reply with no JSON raises"""
+    with pytest.raises(ValueError):
+        _extract_first_json("I could not analyze this issue.")
+
+def test_parse_analysis_response_falls_back_on_truncated_json():
+    """Test truncated replies produce the manual-review fallback analysis"""
+    service = OpenAIService(api_key="test-key")
+    analysis = service._parse_analysis_response('{"summary": "cut', "1")
+    assert analysis.summary == "AI analysis parsing failed"
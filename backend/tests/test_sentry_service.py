@@ -0,0 +1,34 @@
+from app.services.sentry_service import SentryService
+
+BASE = "https://sentry.io/api/0/organizations/acme/issues/"
+
+def parse(link_header: str) -> dict:
+    return SentryService(api_token="test-token", organization="acme")._parse_link_header(link_header)
+
+def test_parse_link_header_returns_next_cursor_when_more_results():
+    """Test a next link with results is returned with its cursor"""
+    links = parse(
+        f'<{BASE}?cursor=0:0:1>; rel="previous"; results="false"; cursor="0:0:1", '
+        f'<{BASE}?cursor=0:100:0&query=is:unresolved>; rel="next"; results="true"; cursor="0:100:0"'
+    )
+
+    assert links == {
+        "next": {"url": f"{BASE}?cursor=0:100:0&query=is:unresolved", "cursor": "0:100:0"}
+    }
+
+def test_parse_link_header_has_no_next_on_last_page():
+    """Test the last page drops the next link marked results=false"""
+    links = parse(
+        f'<{BASE}?cursor=0:0:1>; rel="previous"; results="true"; cursor="0:0:1", '
+        f'<{BASE}?cursor=0:200:0>; rel="next"; results="false"; cursor="0:200:0"'
+    )
+
+    assert "next" not in links
+    assert links["previous"]["cursor"] == "0:0:1"
+
+def test_parse_link_header_ignores_malformed_header():
+    """Test malformed or empty headers yield no links"""
+    assert parse("") == {}
+    assert parse("not a link header") == {}
+    assert parse(f'{BASE}?cursor=0:100:0; rel="next"') == {}
+    assert parse(f'<{BASE}>; rel="next"; results="true"') == {}